@@ -1,5 +1,10 @@
 import argparse
+import os
+import re
+import shutil
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, List, Sequence, Set
 
@@ -91,8 +96,9 @@ MQTT_MSGTYPE_MAP = {
 }
 
 TRUTHY_VALUES = {"true", "1", "yes", "y", "t"}
-HEX_DIGITS = set("0123456789abcdefABCDEF")
+HEX_RE = re.compile(r"[0-9a-fA-F]+")
 PRINTABLE_SAFE = set(string.printable) - {"\t", "\r", "\n", "\x0b", "\x0c"}
+UNSAFE_CHARS_RE = re.compile("[^" + re.escape("".join(sorted(PRINTABLE_SAFE))) + "]+")
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
@@ -102,6 +108,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--chunksize", type=int, default=50000)
     parser.add_argument("--protocols", default="MQTT,MQTTS,MQTT-TLS,AMQP,AMQPS,COAP,COAPS,DDS,HTTP,HTTPS,MODBUS,MODBUS-TCP,BACNET,BACNET/IP,OPC-UA,OPCUA,ZIGBEE,Z-WAVE,ZWAVE,LORAWAN,NB-IOT,BLE,BLUETOOTH,BLUETOOTH-LE")
     parser.add_argument("--force", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
     return parser.parse_args()
 
 def collect_input_paths(raw_inputs: Sequence[str], pattern: str) -> List[Path]:
@@ -193,19 +200,21 @@ def determine_protocol(frame: pd.DataFrame) -> pd.Series:
         cleaned = cleaned.where(cleaned != "UNKNOWN", "MQTT")
     return cleaned
 
+@lru_cache(maxsize=4096)
 def sanitize_text(value: str, limit: int = 120) -> str:
     if not value:
         return ""
-    filtered = ''.join(ch for ch in str(value) if ch in PRINTABLE_SAFE)
+    filtered = UNSAFE_CHARS_RE.sub("", str(value))
     cleaned = ' '.join(filtered.split())
     return cleaned[:limit]
 
+@lru_cache(maxsize=4096)
 def decode_hex_payload(value: str, limit: int = 120) -> str:
     text = str(value).strip()
     if not text:
         return ""
     candidate = text.replace(":", "").replace(" ", "")
-    if candidate and all(ch in HEX_DIGITS for ch in candidate):
+    if HEX_RE.fullmatch(candidate):
         padded = candidate if len(candidate) % 2 == 0 else "0" + candidate
         try:
             raw = bytes.fromhex(padded)
@@ -218,14 +227,11 @@ def decode_hex_payload(value: str, limit: int = 120) -> str:
         return raw[:limit].hex()
     return sanitize_text(text, limit)
 
-def hex_length(value: str) -> int:
-    text = str(value).strip()
-    if not text:
-        return 0
-    candidate = text.replace(":", "").replace(" ", "")
-    if candidate and all(ch in HEX_DIGITS for ch in candidate):
-        return len(candidate) // 2
-    return len(text)
+def hex_length(values: pd.Series) -> pd.Series:
+    text = values.fillna("").astype(str).str.strip()
+    candidate = text.str.replace(":", "", regex=False).str.replace(" ", "", regex=False)
+    is_hex = candidate.str.fullmatch(HEX_RE.pattern).fillna(False).astype(bool)
+    return (candidate.str.len() // 2).where(is_hex, text.str.len())
 
 def compute_payload_length(frame: pd.DataFrame) -> pd.Series:
     series = pick_series(frame, PAYLOAD_LENGTH_CANDIDATES)
@@ -233,8 +239,7 @@ def compute_payload_length(frame: pd.DataFrame) -> pd.Series:
         numeric = pd.to_numeric(series, errors="coerce")
         return numeric.astype("Int64")
     if "mqtt.msg" in frame.columns:
-        lengths = frame["mqtt.msg"].fillna("").apply(hex_length)
-        return pd.to_numeric(lengths, errors="coerce").astype("Int64")
+        return hex_length(frame["mqtt.msg"]).astype("Int64")
     if "payload" in frame.columns:
         lengths = frame["payload"].fillna("").astype(str).str.len()
         return pd.to_numeric(lengths, errors="coerce").astype("Int64")
@@ -242,30 +247,31 @@ def compute_payload_length(frame: pd.DataFrame) -> pd.Series:
         lengths = frame["payload_sample"].fillna("").astype(str).str.len()
         return pd.to_numeric(lengths, errors="coerce").astype("Int64")
     if "tcp.payload" in frame.columns:
-        lengths = frame["tcp.payload"].fillna("").apply(hex_length)
-        return pd.to_numeric(lengths, errors="coerce").astype("Int64")
+        return hex_length(frame["tcp.payload"]).astype("Int64")
     if "mqtt.len" in frame.columns:
         numeric = pd.to_numeric(frame["mqtt.len"], errors="coerce")
         return numeric.astype("Int64")
     return pd.Series(pd.NA, index=frame.index, dtype="Int64")
 
-def build_payload_sample(row: pd.Series) -> str:
+def build_payload_sample(frame: pd.DataFrame) -> pd.Series:
+    samples = pd.Series("", index=frame.index, dtype="object")
+    pending = pd.Series(True, index=frame.index)
     for column, treat_as_hex in PAYLOAD_PRIORITY:
-        if column not in row:
-            continue
-        value = row[column]
-        if pd.isna(value):
+        if column not in frame.columns:
             continue
-        text = str(value).strip()
-        if not text:
+        values = frame[column][pending]
+        values = values[values.notna()]
+        text = values.astype(str).str.strip()
+        text = text[text != ""]
+        if text.empty:
             continue
-        if treat_as_hex:
-            decoded = decode_hex_payload(text)
-        else:
-            decoded = sanitize_text(text)
-        if decoded:
-            return decoded
-    return ""
+        decoded = text.map(decode_hex_payload if treat_as_hex else sanitize_text)
+        decoded = decoded[decoded != ""]
+        samples[decoded.index] = decoded
+        pending[decoded.index] = False
+        if not pending.any():
+            break
+    return samples
 
 def map_packet_type(frame: pd.DataFrame) -> pd.Series:
     series = pick_series(frame, PACKET_TYPE_CANDIDATES)
@@ -289,6 +295,16 @@ def canonicalize_chunk(
     chunk.columns = [col.strip() for col in chunk.columns]
 
     ts_series = parse_timestamp(chunk)
+    if ts_series is None:
+        return pd.DataFrame(columns=CANONICAL_COLUMNS)
+    protocol = determine_protocol(chunk)
+    keep = ts_series.notna() & protocol.isin(allowed_protocols)
+    if not keep.any():
+        return pd.DataFrame(columns=CANONICAL_COLUMNS)
+    if not keep.all():
+        chunk = chunk[keep]
+        ts_series = ts_series[keep]
+        protocol = protocol[keep]
     formatted_ts = format_timestamp(ts_series, len(chunk))
 
     src_ip = string_series(chunk, SRC_IP_CANDIDATES)
@@ -307,9 +323,8 @@ def canonicalize_chunk(
     dup_flag = bool_flag_series(chunk, DUP_CANDIDATES)
     payload_length = compute_payload_length(chunk)
 
-    payload_sample = chunk.apply(build_payload_sample, axis=1)
+    payload_sample = build_payload_sample(chunk)
     packet_type = map_packet_type(chunk)
-    protocol = determine_protocol(chunk)
 
     connack_code = string_series(chunk, CONNACK_CANDIDATES)
     label = string_series(chunk, LABEL_CANDIDATES, default="unknown")
@@ -343,43 +358,95 @@ def canonicalize_chunk(
         }
     )
 
-    df = df[df["timestamp"] != ""]
-    df = df[df["protocol"].isin(allowed_protocols)]
-
     return df[CANONICAL_COLUMNS]
 
+def canonicalize_file(
+    path: Path,
+    output_path: Path,
+    chunksize: int,
+    allowed_protocols: Set[str],
+    write_header: bool,
+) -> int:
+    try:
+        reader = pd.read_csv(path, chunksize=chunksize, low_memory=False)
+    except Exception as exc:
+        print(f"[error] Failed to read {path}: {exc}", file=sys.stderr)
+        return 0
+    rows = 0
+    for chunk in reader:
+        canonical = canonicalize_chunk(chunk, path.name, allowed_protocols)
+        if canonical.empty:
+            continue
+        canonical.to_csv(
+            output_path,
+            mode="a",
+            header=write_header and rows == 0,
+            index=False,
+        )
+        rows += len(canonical)
+    return rows
+
 def process_files(
     input_paths: Sequence[Path],
     output_path: Path,
     chunksize: int,
     allowed_protocols: Set[str],
+    workers: int = 1,
 ) -> int:
-    total_rows = 0
-    header_written = False
+    existing = []
     for path in input_paths:
         if not path.exists():
             print(f"[warn] Skipping missing file: {path}", file=sys.stderr)
             continue
-        try:
-            reader = pd.read_csv(path, chunksize=chunksize, low_memory=False)
-        except Exception as exc:
-            print(f"[error] Failed to read {path}: {exc}", file=sys.stderr)
-            continue
-        for chunk in reader:
-            canonical = canonicalize_chunk(chunk, path.name, allowed_protocols)
-            if canonical.empty:
-                continue
-            canonical.to_csv(
-                output_path,
-                mode="a",
-                header=not header_written,
-                index=False,
-            )
-            header_written = True
-            total_rows += len(canonical)
+        existing.append(path)
+
+    if workers > 1 and len(existing) > 1:
+        return process_files_parallel(existing, output_path, chunksize, allowed_protocols, workers)
+
+    total_rows = 0
+    for path in existing:
+        total_rows += canonicalize_file(path, output_path, chunksize, allowed_protocols, total_rows == 0)
         print(f"[info] Processed {path} -> {total_rows} rows cumulative", file=sys.stderr)
     return total_rows
 
+def process_files_parallel(
+    input_paths: Sequence[Path],
+    output_path: Path,
+    chunksize: int,
+    allowed_protocols: Set[str],
+    workers: int,
+) -> int:
+    # One process per input file, each writing its own part file; parts are concatenated in input order
+    part_paths = [output_path.with_name(f"{output_path.name}.part{idx}") for idx in range(len(input_paths))]
+    for part_path in part_paths:
+        part_path.unlink(missing_ok=True)
+    total_rows = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(canonicalize_file, path, part_path, chunksize, allowed_protocols, True)
+                for path, part_path in zip(input_paths, part_paths)
+            ]
+
+            with output_path.open("wb") as out:
+                for path, part_path, future in zip(input_paths, part_paths, futures):
+                    rows = future.result()
+                    if rows:
+                        with part_path.open("rb") as part:
+                            header = part.readline()
+                            if total_rows == 0:
+                                out.write(header)
+                            shutil.copyfileobj(part, out)
+                        total_rows += rows
+                    part_path.unlink(missing_ok=True)
+                    print(f"[info] Processed {path} -> {total_rows} rows cumulative", file=sys.stderr)
+    finally:
+        for part_path in part_paths:
+            part_path.unlink(missing_ok=True)
+    if total_rows == 0:
+        output_path.unlink(missing_ok=True)
+    return total_rows
+
 def main() -> None:
     args = parse_args()
     allowed_protocols = {p.strip().upper() for p in args.protocols.split(",") if p.strip()}
@@ -403,7 +470,7 @@ def main() -> None:
         output_path.unlink()
 
     try:
-        total_rows = process_files(input_paths, output_path, args.chunksize, allowed_protocols)
+        total_rows = process_files(input_paths, output_path, args.chunksize, allowed_protocols, args.workers)
     except KeyboardInterrupt:
         print("[warn] Interrupted by user", file=sys.stderr)
         sys.exit(130)
@@ -9,12 +9,22 @@ import json
 import time
 import random
 import threading
+import signal
 import argparse
 import logging
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict
 import uuid
 
+# Fast JSON encoder: orjson nếu có cài, fallback stdlib json (cả hai trả về UTF-8 bytes)
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
 # Setup logging với UTF-8 encoding cho Windows
 logging.basicConfig(
     level=logging.INFO,
@@ -25,18 +35,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@dataclass(slots=True, frozen=True)
+class CameraConfig:
+    """Cấu hình cố định của một camera (sinh ngẫu nhiên lúc init, không đổi trong simulation)"""
+    camera_id: str
+    zone: str
+    resolution: str
+    fps: int
+    model: str
+    ip_address: str
+    mac_address: str
+    firmware_version: str
+    install_date: str
+    night_vision: bool
+    ptz_capable: bool
+    audio_enabled: bool
+    topics: Dict[str, str]
+
 class CameraMQTTSimulator:
     """
     Camera IoT Simulator với MQTT protocol
     Simulate: Camera status, Motion detection, Security events, System telemetry
     """
     
-    def __init__(self, broker="localhost", port=1883, num_cameras=5):
+    def __init__(self, broker="localhost", port=1883, num_cameras=5, verbose=False):
         self.broker = broker
         self.port = port
         self.num_cameras = num_cameras
+        self.verbose = verbose
         self.client = None
         self.running = False
+        self.stop_event = threading.Event()
         
         # Initialize states first
         self.motion_detection_active = {}
@@ -49,31 +78,41 @@ class CameraMQTTSimulator:
         logger.info(f"📡 Broker: {self.broker}:{self.port}")
         logger.info(f"🎬 Cameras: {self.num_cameras}")
         
-    def _init_cameras(self) -> List[Dict[str, Any]]:
+    def _init_cameras(self) -> List[CameraConfig]:
         """Initialize camera configurations"""
         cameras = []
         zones = ["entrance", "lobby", "parking", "warehouse", "office", "cafeteria", "server_room"]
         
         for i in range(1, self.num_cameras + 1):
-            camera = {
-                "camera_id": f"cam_{i:03d}",
-                "zone": random.choice(zones),
-                "resolution": random.choice(["1920x1080", "1280x720", "3840x2160", "1600x1200"]),
-                "fps": random.choice([15, 24, 30, 60]),
-                "model": random.choice(["HikVision DS-2CD2086G2", "Dahua IPC-HFW5241E", "Axis M3046-V", "Bosch NBE-4502-AL"]),
-                "ip_address": f"192.168.1.{100+i}",
-                "mac_address": f"00:11:22:33:44:{i:02X}",
-                "firmware_version": f"V5.{random.randint(6,9)}.{random.randint(10,40)}",
-                "install_date": f"2024-{random.randint(1,12):02d}-{random.randint(1,28):02d}",
-                "night_vision": random.choice([True, False]),
-                "ptz_capable": random.choice([True, False]),
-                "audio_enabled": random.choice([True, False])
-            }
+            camera_id = f"cam_{i:03d}"
+            zone = random.choice(zones)
+            camera = CameraConfig(
+                camera_id=camera_id,
+                zone=zone,
+                resolution=random.choice(["1920x1080", "1280x720", "3840x2160", "1600x1200"]),
+                fps=random.choice([15, 24, 30, 60]),
+                model=random.choice(["HikVision DS-2CD2086G2", "Dahua IPC-HFW5241E", "Axis M3046-V", "Bosch NBE-4502-AL"]),
+                ip_address=f"192.168.1.{100+i}",
+                mac_address=f"00:11:22:33:44:{i:02X}",
+                firmware_version=f"V5.{random.randint(6,9)}.{random.randint(10,40)}",
+                install_date=f"2024-{random.randint(1,12):02d}-{random.randint(1,28):02d}",
+                night_vision=random.random() < 0.5,
+                ptz_capable=random.random() < 0.5,
+                audio_enabled=random.random() < 0.5,
+                # MQTT topics của camera dựng sẵn một lần thay vì format lại mỗi lần publish
+                topics={
+                    "status": f"surveillance/{zone}/camera/{camera_id}/status",
+                    "motion": f"surveillance/{zone}/camera/{camera_id}/motion",
+                    "stream": f"surveillance/{zone}/camera/{camera_id}/stream",
+                    "security": f"security/{zone}/camera/{camera_id}/event",
+                    "system": f"system/{zone}/camera/{camera_id}/event"
+                }
+            )
             cameras.append(camera)
             
             # Initialize states
-            self.motion_detection_active[camera["camera_id"]] = True
-            self.recording_status[camera["camera_id"]] = random.choice([True, False])
+            self.motion_detection_active[camera.camera_id] = True
+            self.recording_status[camera.camera_id] = random.random() < 0.5
             
         return cameras
     
@@ -111,6 +150,7 @@ class CameraMQTTSimulator:
         """Callback when disconnected from broker"""
         logger.info(f"📤 Disconnected from MQTT broker, return code {rc}")
         self.running = False
+        self.stop_event.set()
     
     def _on_publish(self, client, userdata, mid, reason_code=None, properties=None):
         """Callback when message is published"""
@@ -157,37 +197,40 @@ class CameraMQTTSimulator:
         for thread in threads:
             thread.start()
         
+        # Ctrl+C / SIGTERM (hoặc mất kết nối broker) chỉ set stop_event; main thread block trên Event.wait thay vì poll mỗi giây
+        def _request_stop(signum, frame):
+            self.stop_event.set()
+        signal.signal(signal.SIGINT, _request_stop)
+        signal.signal(signal.SIGTERM, _request_stop)
+        
         try:
-            if duration > 0:
-                time.sleep(duration)
-                logger.info(f"⏰ Simulation duration reached: {duration} seconds")
+            if self.stop_event.wait(duration if duration > 0 else None):
+                logger.info(f"⏹️ Simulation stopped")
             else:
-                # Run until interrupted
-                while self.running:
-                    time.sleep(1)
-                    
-        except KeyboardInterrupt:
-            logger.info(f"⏹️ Simulation stopped by user")
+                logger.info(f"⏰ Simulation duration reached: {duration} seconds")
         finally:
             self.stop_simulation()
     
     def _simulate_status_telemetry(self, interval):
         """Simulate camera status telemetry"""
+        # Per-camera topic, camera_id và các fields cố định (serialize sẵn thành JSON prefix) dựng một lần, ngoài publish loop
+        publish = self.client.publish
+        targets = [
+            (camera, camera.camera_id, camera.topics["status"], self._static_payload_prefix(camera, (
+                "resolution", "fps", "model", "ip_address", "firmware_version"
+            )))
+            for camera in self.cameras
+        ]
+        next_tick = time.monotonic()
         while self.running:
-            for camera in self.cameras:
+            # Dựng payloads của cả tick trước, rồi publish back-to-back (không log xen giữa các sends)
+            batch = []
+            for camera, camera_id, topic, payload_prefix in targets:
                 try:
-                    # Generate realistic camera status
+                    # Generate realistic camera status (chỉ các fields thay đổi mỗi tick)
                     status_data = {
-                        "device_type": "Camera",
-                        "camera_id": camera["camera_id"],
-                        "zone": camera["zone"],
                         "timestamp": datetime.now(timezone.utc).isoformat(),
                         "status": random.choices(["online", "offline", "maintenance"], weights=[85, 10, 5])[0],
-                        "resolution": camera["resolution"],
-                        "fps": camera["fps"],
-                        "model": camera["model"],
-                        "ip_address": camera["ip_address"],
-                        "firmware_version": camera["firmware_version"],
                         "uptime_hours": random.randint(1, 8760),  # Up to 1 year
                         "temperature": round(random.uniform(35.0, 75.0), 1),  # Celsius
                         "cpu_usage": round(random.uniform(15.0, 85.0), 1),  # Percentage
@@ -196,26 +239,52 @@ class CameraMQTTSimulator:
                         "storage_total_gb": random.choice([256, 512, 1024, 2048]),
                         "network_rx_mbps": round(random.uniform(1.0, 25.0), 2),
                         "network_tx_mbps": round(random.uniform(5.0, 50.0), 2),
-                        "recording": self.recording_status[camera["camera_id"]],
-                        "motion_detection_enabled": self.motion_detection_active[camera["camera_id"]],
-                        "night_vision_active": camera["night_vision"] and random.choice([True, False]),
+                        "recording": self.recording_status[camera_id],
+                        "motion_detection_enabled": self.motion_detection_active[camera_id],
+                        "night_vision_active": camera.night_vision and random.random() < 0.5,
                         "ptz_position": {
-                            "pan": random.randint(0, 360) if camera["ptz_capable"] else None,
-                            "tilt": random.randint(-90, 90) if camera["ptz_capable"] else None,
-                            "zoom": random.randint(1, 30) if camera["ptz_capable"] else None
-                        } if camera["ptz_capable"] else None
+                            "pan": random.randint(0, 360) if camera.ptz_capable else None,
+                            "tilt": random.randint(-90, 90) if camera.ptz_capable else None,
+                            "zoom": random.randint(1, 30) if camera.ptz_capable else None
+                        } if camera.ptz_capable else None
                     }
                     
-                    topic = f"surveillance/{camera['zone']}/camera/{camera['camera_id']}/status"
-                    payload = json.dumps(status_data, ensure_ascii=False)
-                    
-                    self.client.publish(topic, payload, qos=1)
-                    logger.info(f"📊 [Status] {camera['camera_id']} @ {camera['zone']} - {status_data['status']}")
+                    batch.append((camera, camera_id, topic, payload_prefix + _dumps(status_data)[1:], status_data["status"]))
                     
                 except Exception as e:
-                    logger.error(f"❌ Error publishing status for {camera['camera_id']}: {e}")
+                    logger.error(f"❌ Error building status for {camera_id}: {e}")
+            
+            published = []
+            for camera, camera_id, topic, payload, status in batch:
+                try:
+                    publish(topic, payload, qos=1)
+                    published.append((camera, camera_id, status))
+                except Exception as e:
+                    logger.error(f"❌ Error publishing status for {camera_id}: {e}")
+            
+            if self.verbose:
+                for camera, camera_id, status in published:
+                    logger.info(f"📊 [Status] {camera_id} @ {camera.zone} - {status}")
+            else:
+                online = sum(1 for _, _, status in published if status == "online")
+                logger.info(f"📊 [Status] {len(published)} cameras published ({online} online)")
             
-            time.sleep(interval)
+            # Absolute schedule trên monotonic clock: thời gian publish không làm trễ dần các ticks
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    
+    @staticmethod
+    def _static_payload_prefix(camera, fields):
+        """
+        JSON prefix (bỏ '}' cuối, thêm ',') cho các fields không đổi của camera;
+        payload mỗi tick = prefix + _dumps(dynamic_fields)[1:]
+        """
+        static_data = {"device_type": "Camera", "camera_id": camera.camera_id, "zone": camera.zone}
+        for field in fields:
+            static_data[field] = getattr(camera, field)
+        return _dumps(static_data)[:-1] + b","
     
     def _simulate_motion_detection(self, min_interval, max_interval):
         """Simulate motion detection events"""
@@ -225,7 +294,7 @@ class CameraMQTTSimulator:
             time.sleep(sleep_time)
             
             # Select random camera that has motion detection enabled
-            active_cameras = [cam for cam in self.cameras if self.motion_detection_active[cam["camera_id"]]]
+            active_cameras = [cam for cam in self.cameras if self.motion_detection_active[cam.camera_id]]
             if not active_cameras:
                 continue
                 
@@ -236,8 +305,8 @@ class CameraMQTTSimulator:
                 motion_data = {
                     "device_type": "Camera",
                     "event_type": "motion_detected",
-                    "camera_id": camera["camera_id"],
-                    "zone": camera["zone"],
+                    "camera_id": camera.camera_id,
+                    "zone": camera.zone,
                     "timestamp": datetime.now(timezone.utc).isoformat(),
                     "confidence": round(random.uniform(0.3, 0.99), 2),
                     "motion_area_percent": round(random.uniform(2.0, 25.0), 1),
@@ -259,14 +328,14 @@ class CameraMQTTSimulator:
                     "alert_level": random.choices(["low", "medium", "high"], weights=[60, 30, 10])[0]
                 }
                 
-                topic = f"surveillance/{camera['zone']}/camera/{camera['camera_id']}/motion"
-                payload = json.dumps(motion_data, ensure_ascii=False)
+                topic = camera.topics["motion"]
+                payload = _dumps(motion_data)
                 
                 self.client.publish(topic, payload, qos=2)  # QoS 2 for important events
-                logger.info(f"🚶 [Motion] {camera['camera_id']} @ {camera['zone']} - Confidence: {motion_data['confidence']}")
+                logger.info(f"🚶 [Motion] {camera.camera_id} @ {camera.zone} - Confidence: {motion_data['confidence']}")
                 
             except Exception as e:
-                logger.error(f"❌ Error publishing motion event for {camera['camera_id']}: {e}")
+                logger.error(f"❌ Error publishing motion event for {camera.camera_id}: {e}")
     
     def _simulate_security_events(self, min_interval, max_interval):
         """Simulate security-related events"""
@@ -288,26 +357,26 @@ class CameraMQTTSimulator:
                 security_data = {
                     "device_type": "Camera",
                     "event_type": event_type,
-                    "camera_id": camera["camera_id"],
-                    "zone": camera["zone"],
+                    "camera_id": camera.camera_id,
+                    "zone": camera.zone,
                     "timestamp": datetime.now(timezone.utc).isoformat(),
                     "severity": random.choices(["info", "warning", "critical"], weights=[50, 35, 15])[0],
                     "confidence": round(random.uniform(0.4, 0.98), 2),
                     "details": self._generate_event_details(event_type),
-                    "snapshot_id": f"snap_{camera['camera_id']}_{int(time.time())}",
-                    "video_clip_id": f"clip_{camera['camera_id']}_{int(time.time())}" if random.choice([True, False]) else None,
-                    "alert_sent": random.choice([True, False]),
-                    "requires_action": random.choice([True, False])
+                    "snapshot_id": f"snap_{camera.camera_id}_{int(time.time())}",
+                    "video_clip_id": f"clip_{camera.camera_id}_{int(time.time())}" if random.random() < 0.5 else None,
+                    "alert_sent": random.random() < 0.5,
+                    "requires_action": random.random() < 0.5
                 }
                 
-                topic = f"security/{camera['zone']}/camera/{camera['camera_id']}/event"
-                payload = json.dumps(security_data, ensure_ascii=False)
+                topic = camera.topics["security"]
+                payload = _dumps(security_data)
                 
                 self.client.publish(topic, payload, qos=2)
-                logger.info(f"🚨 [Security] {camera['camera_id']} @ {camera['zone']} - {event_type} ({security_data['severity']})")
+                logger.info(f"🚨 [Security] {camera.camera_id} @ {camera.zone} - {event_type} ({security_data['severity']})")
                 
             except Exception as e:
-                logger.error(f"❌ Error publishing security event for {camera['camera_id']}: {e}")
+                logger.error(f"❌ Error publishing security event for {camera.camera_id}: {e}")
     
     def _generate_event_details(self, event_type):
         """Generate realistic event details based on event type"""
@@ -329,7 +398,7 @@ class CameraMQTTSimulator:
         elif event_type == "vehicle_detected":
             details = {
                 "vehicle_type": random.choice(["car", "truck", "motorcycle", "bicycle", "van"]),
-                "license_plate": f"ABC{random.randint(100, 999)}" if random.choice([True, False]) else "unknown",
+                "license_plate": f"ABC{random.randint(100, 999)}" if random.random() < 0.5 else "unknown",
                 "color": random.choice(["white", "black", "silver", "blue", "red"])
             }
         elif event_type == "tampering_detected":
@@ -361,29 +430,29 @@ class CameraMQTTSimulator:
                 system_data = {
                     "device_type": "Camera",
                     "event_type": event_type,
-                    "camera_id": camera["camera_id"],
-                    "zone": camera["zone"],
+                    "camera_id": camera.camera_id,
+                    "zone": camera.zone,
                     "timestamp": datetime.now(timezone.utc).isoformat(),
                     "source": "system",
                     "details": self._generate_system_event_details(event_type, camera),
                     "user_id": f"admin_{random.randint(1, 5)}" if event_type in ["config_changed", "firmware_update"] else None,
-                    "requires_attention": random.choice([True, False])
+                    "requires_attention": random.random() < 0.5
                 }
                 
-                topic = f"system/{camera['zone']}/camera/{camera['camera_id']}/event"
-                payload = json.dumps(system_data, ensure_ascii=False)
+                topic = camera.topics["system"]
+                payload = _dumps(system_data)
                 
                 self.client.publish(topic, payload, qos=1)
-                logger.info(f"🔧 [System] {camera['camera_id']} @ {camera['zone']} - {event_type}")
+                logger.info(f"🔧 [System] {camera.camera_id} @ {camera.zone} - {event_type}")
                 
                 # Update camera state based on events
                 if event_type == "maintenance_mode":
-                    self.recording_status[camera["camera_id"]] = False
+                    self.recording_status[camera.camera_id] = False
                 elif event_type == "config_changed" and "motion_detection" in system_data["details"]:
-                    self.motion_detection_active[camera["camera_id"]] = random.choice([True, False])
+                    self.motion_detection_active[camera.camera_id] = random.random() < 0.5
                     
             except Exception as e:
-                logger.error(f"❌ Error publishing system event for {camera['camera_id']}: {e}")
+                logger.error(f"❌ Error publishing system event for {camera.camera_id}: {e}")
     
     def _generate_system_event_details(self, event_type, camera):
         """Generate system event details"""
@@ -395,14 +464,14 @@ class CameraMQTTSimulator:
             }
         elif event_type == "firmware_update":
             return {
-                "old_version": camera["firmware_version"],
+                "old_version": camera.firmware_version,
                 "new_version": f"V5.{random.randint(7,9)}.{random.randint(50,99)}",
                 "update_size_mb": random.randint(10, 100)
             }
         elif event_type == "storage_full":
             return {
                 "storage_used_percent": random.randint(95, 100),
-                "oldest_files_deleted": random.choice([True, False])
+                "oldest_files_deleted": random.random() < 0.5
             }
         elif event_type == "temperature_warning":
             return {
@@ -414,38 +483,46 @@ class CameraMQTTSimulator:
     
     def _simulate_stream_metadata(self, interval):
         """Simulate video stream metadata (not actual video)"""
+        # Per-camera topic và camera_id lấy ra một lần, ngoài publish loop
+        publish = self.client.publish
+        recording_status = self.recording_status
+        targets = [
+            (camera, camera.camera_id, camera.topics["stream"], self._static_payload_prefix(camera, ()))
+            for camera in self.cameras
+        ]
+        next_tick = time.monotonic()
         while self.running:
-            for camera in self.cameras:
-                if not self.recording_status[camera["camera_id"]]:
+            for camera, camera_id, topic, payload_prefix in targets:
+                if not recording_status[camera_id]:
                     continue
                     
                 try:
                     stream_data = {
-                        "device_type": "Camera",
-                        "camera_id": camera["camera_id"],
-                        "zone": camera["zone"],
                         "timestamp": datetime.now(timezone.utc).isoformat(),
                         "stream_status": "active",
-                        "current_fps": camera["fps"] + random.randint(-2, 2),
-                        "current_resolution": camera["resolution"],
+                        "current_fps": camera.fps + random.randint(-2, 2),
+                        "current_resolution": camera.resolution,
                         "bitrate_kbps": random.randint(1000, 8000),
                         "frame_count": random.randint(1000000, 9999999),
                         "dropped_frames": random.randint(0, 50),
                         "encoding": random.choice(["H.264", "H.265", "MJPEG"]),
-                        "audio_enabled": camera["audio_enabled"],
+                        "audio_enabled": camera.audio_enabled,
                         "storage_remaining_hours": round(random.uniform(24, 168), 1),  # 1-7 days
                         "quality_score": round(random.uniform(0.8, 1.0), 2)
                     }
                     
-                    topic = f"surveillance/{camera['zone']}/camera/{camera['camera_id']}/stream"
-                    payload = json.dumps(stream_data, ensure_ascii=False)
+                    payload = payload_prefix + _dumps(stream_data)[1:]
                     
-                    self.client.publish(topic, payload, qos=0)  # QoS 0 for frequent metadata
+                    publish(topic, payload, qos=0)  # QoS 0 for frequent metadata
                     
                 except Exception as e:
-                    logger.error(f"❌ Error publishing stream metadata for {camera['camera_id']}: {e}")
+                    logger.error(f"❌ Error publishing stream metadata for {camera_id}: {e}")
             
-            time.sleep(interval)
+            # Absolute schedule trên monotonic clock: thời gian publish không làm trễ dần các ticks
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
     
     def stop_simulation(self):
         """Stop the simulation"""
@@ -465,6 +542,8 @@ def main():
     parser.add_argument("--cameras", type=int, default=5, help="Number of cameras to simulate")
     parser.add_argument("--duration", type=int, default=0, 
                        help="Simulation duration in seconds (0 = infinite)")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Log every camera status message")
     
     args = parser.parse_args()
     
@@ -472,7 +551,8 @@ def main():
         simulator = CameraMQTTSimulator(
             broker=args.broker,
             port=args.port,
-            num_cameras=args.cameras
+            num_cameras=args.cameras,
+            verbose=args.verbose
         )
         
         simulator.start_simulation(duration=args.duration)
@@ -10,6 +10,13 @@ import logging
 from datetime import datetime
 import argparse
 
+# Fast JSON decoder: orjson nếu có cài, fallback stdlib json (cả hai nhận bytes hoặc str)
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -55,7 +62,7 @@ class CameraMQTTSubscriber:
         try:
             self.message_count += 1
             topic = msg.topic
-            payload = json.loads(msg.payload.decode('utf-8'))
+            payload = _loads(msg.payload)
             
             # Parse topic to get info
             topic_parts = topic.split('/')
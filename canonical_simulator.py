@@ -4,13 +4,23 @@ MQTT IoT Simulator theo Flow chuẩn:
 Dataset thô → Canonical schema → Simulator → EMQX + Logging → Feature extraction → Detection
 """
 
-import argparse, threading, time, os, json, csv
+import argparse, threading, time, os, json, csv, signal, heapq, itertools
 import paho.mqtt.client as mqtt
+import numpy as np
 import pandas as pd
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 import random
 import logging
 
+# Fast JSON encoder: orjson nếu có cài, fallback stdlib json (cả hai trả về bytes)
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
 # Setup logging for flow tracking  
 logging.basicConfig(
     level=logging.INFO,
@@ -29,19 +39,90 @@ def log_error(device_type, error):
 def log_success(device_type):
     logger.info(f"[OK] {device_type} canonical simulator connected")
 
+@dataclass(slots=True, frozen=True)
+class CanonicalEvent:
+    """
+    Một canonical record đã chuẩn bị sẵn để publish.
+    payload_prefix là JSON object đã serialize nhưng bỏ dấu '}' cuối, để replay loop
+    chỉ cần nối thêm các per-publish fields (simulator_timestamp, canonical_record_id).
+    """
+    topic: str
+    payload_prefix: bytes
+    qos: int
+    retain: bool
+
+@dataclass(slots=True, frozen=True)
+class DeviceProfile:
+    """
+    Device type và các keywords nhận diện record của nó trong canonical dataset (match trên payload hoặc topic).
+    pattern là regex alternation dựng sẵn từ keywords.
+    """
+    device_type: str
+    keywords: tuple
+    pattern: str = field(init=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'pattern', '|'.join(self.keywords))
+
+# Group by device types dựa trên payload patterns và topics
+DEVICE_PROFILES = (
+    # Original devices
+    DeviceProfile('Temperature', ('temperature', 'temp')),
+    DeviceProfile('Humidity', ('humidity', 'humid')),
+    DeviceProfile('CO2', ('co2', 'co-gas', 'gas')),
+    DeviceProfile('Light', ('light', 'lux', 'intensity')),
+    DeviceProfile('Motion', ('motion', 'movement', 'pir')),
+    DeviceProfile('Smoke', ('smoke', 'fire')),
+    DeviceProfile('Fan', ('fan', 'speed')),
+    DeviceProfile('Door', ('door', 'lock')),
+    DeviceProfile('Vibration', ('vibration', 'vib')),
+    
+    # Edge-IIoT devices
+    DeviceProfile('DistanceSensor', ('Distance',)),
+    DeviceProfile('FlameSensor', ('Flame_Sensor',)),
+    DeviceProfile('PhLevelSensor', ('PhLv',)),
+    DeviceProfile('SoilMoisture', ('soil_moisture',)),
+    DeviceProfile('SoundSensor', ('sound_sensors',)),
+    DeviceProfile('WaterLevel', ('WaterLV',)),
+    
+    # Gotham city devices
+    DeviceProfile('AirQuality', ('city/air',)),
+    DeviceProfile('CoolerMotor', ('vibration/cooler',)),
+    DeviceProfile('HydraulicSystem', ('hydraulic/rig',)),
+    DeviceProfile('PredictiveMaintenance', ('maintenance/iotsim',)),
+)
+
+# Tên device types hợp lệ cho --devices, theo thứ tự của DEVICE_PROFILES
+DEVICE_TYPES = tuple(profile.device_type for profile in DEVICE_PROFILES)
+
 class CanonicalMQTTSimulator:
     """
     Simulator theo flow chuẩn: Canonical Dataset → MQTT Traffic → Broker Logging
     """
     
-    def __init__(self, canonical_file="canonical_dataset.csv", broker="localhost", port=1883):
+    # Columns simulator dùng; các cột còn lại của canonical dataset bỏ qua lúc parse
+    CANONICAL_COLUMNS = ('protocol', 'topic', 'Payload_sample', 'qos', 'retain')
+    
+    # Publishes due trong khoảng này (seconds) được gộp vào cùng một lần wakeup của scheduler
+    BATCH_HORIZON = 0.01
+    
+    # Khi mất kết nối, scheduler block trên connected Event và check stop_event sau mỗi khoảng này (seconds)
+    RECONNECT_POLL = 0.5
+    
+    # Số canonical records tối đa giữ lại cho mỗi device type
+    MAX_DEVICE_RECORDS = 1000
+    
+    def __init__(self, canonical_file="canonical_dataset.csv", broker="localhost", port=1883, verbose=False):
         self.canonical_file = canonical_file
         self.broker = broker
         self.port = port
-        self.clients = {}
+        self.verbose = verbose
+        self.client = None
         self.canonical_data = None
         self.device_data = {}
         self.stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.rng = np.random.default_rng()
         
         # Load canonical dataset
         self._load_canonical_data()
@@ -59,11 +140,17 @@ class CanonicalMQTTSimulator:
         chunk_size = 50000
         chunks = []
         
-        for chunk in pd.read_csv(self.canonical_file, chunksize=chunk_size):
-            # Filter chỉ lấy MQTT protocol records
-            mqtt_chunk = chunk[chunk['protocol'].str.contains('MQTT', case=False, na=False)]
-            if not mqtt_chunk.empty:
-                chunks.append(mqtt_chunk)
+        reader = pd.read_csv(self.canonical_file, chunksize=chunk_size,
+                             usecols=lambda column: column in self.CANONICAL_COLUMNS,
+                             dtype={'protocol': 'category'})
+        with reader:
+            for chunk in reader:
+                # Filter chỉ lấy MQTT protocol records: match trên các protocol values unique, rồi isin cho cả chunk
+                protocols = chunk['protocol'].cat.categories
+                mqtt_protocols = protocols[protocols.astype(str).str.contains('MQTT', case=False)]
+                mqtt_chunk = chunk[chunk['protocol'].isin(mqtt_protocols)]
+                if not mqtt_chunk.empty:
+                    chunks.append(mqtt_chunk)
                 
         if chunks:
             self.canonical_data = pd.concat(chunks, ignore_index=True)
@@ -76,49 +163,23 @@ class CanonicalMQTTSimulator:
         """Chuẩn bị data cho từng device type từ canonical dataset"""
         logger.info("[SETUP] Preparing device datasets from canonical schema...")
         
-        # Group by device types dựa trên payload patterns và topics
-        device_patterns = {
-            # Original devices
-            'Temperature': ['temperature', 'temp'],
-            'Humidity': ['humidity', 'humid'],
-            'CO2': ['co2', 'co-gas', 'gas'],
-            'Light': ['light', 'lux', 'intensity'], 
-            'Motion': ['motion', 'movement', 'pir'],
-            'Smoke': ['smoke', 'fire'],
-            'Fan': ['fan', 'speed'],
-            'Door': ['door', 'lock'],
-            'Vibration': ['vibration', 'vib'],
-            
-            # Edge-IIoT devices  
-            'DistanceSensor': ['Distance'],
-            'FlameSensor': ['Flame_Sensor'],
-            'PhLevelSensor': ['PhLv'],
-            'SoilMoisture': ['soil_moisture'],
-            'SoundSensor': ['sound_sensors'],
-            'WaterLevel': ['WaterLV'],
-            
-            # Gotham city devices
-            'AirQuality': ['city/air'],
-            'CoolerMotor': ['vibration/cooler'],
-            'HydraulicSystem': ['hydraulic/rig'],
-            'PredictiveMaintenance': ['maintenance/iotsim']
-        }
+        # Payload_sample và topic ghép thành một search key (phân cách bằng \x1f) dựng một lần,
+        # để mỗi device type chỉ cần một regex pass thay vì hai
+        search_keys = (
+            self.canonical_data['Payload_sample'].fillna('').astype(str) + '\x1f' +
+            self.canonical_data['topic'].fillna('').astype(str)
+        )
         
-        for device_type, patterns in device_patterns.items():
+        for profile in DEVICE_PROFILES:
+            device_type = profile.device_type
             # Filter records có payload match với device patterns hoặc topic match
-            device_records = self.canonical_data[
-                (self.canonical_data['Payload_sample'].str.contains(
-                    '|'.join(patterns), case=False, na=False
-                )) |
-                (self.canonical_data['topic'].str.contains(
-                    '|'.join(patterns), case=False, na=False
-                ))
-            ].copy()
+            matched = np.flatnonzero(search_keys.str.contains(profile.pattern, case=False, na=False).to_numpy(dtype=bool))
             
-            if not device_records.empty:
-                # Sample records để tránh duplicate quá nhiều
-                sample_size = min(1000, len(device_records))
-                self.device_data[device_type] = device_records.sample(n=sample_size).reset_index(drop=True)
+            if matched.size:
+                # Sample row positions để tránh duplicate quá nhiều, chỉ copy tối đa MAX_DEVICE_RECORDS rows
+                sample_size = min(self.MAX_DEVICE_RECORDS, matched.size)
+                sampled = self.rng.choice(matched, size=sample_size, replace=False)
+                self.device_data[device_type] = self.canonical_data.iloc[sampled].reset_index(drop=True)
                 logger.info(f"  [DEVICE] {device_type}: {len(self.device_data[device_type])} records prepared")
             else:
                 # Tạo synthetic data nếu không có trong canonical
@@ -172,7 +233,7 @@ class CanonicalMQTTSimulator:
             }),
             'FlameSensor': lambda: json.dumps({
                 "device_id": f"flame_{random.randint(1,3):03d}",
-                "flame_detected": random.choice([True, False]),
+                "flame_detected": random.random() < 0.5,
                 "intensity": random.randint(0, 1023)
             }),
             'PhLevelSensor': lambda: json.dumps({
@@ -265,130 +326,251 @@ class CanonicalMQTTSimulator:
         for device in available_devices:
             logger.info(f"   - {device}: {len(self.device_data[device])} canonical records")
         
-        # Start simulation threads
-        threads = []
-        for device_type in available_devices:
-            thread = threading.Thread(
-                target=self._simulate_device_canonical,
-                args=(device_type, publish_interval),
-                daemon=True
-            )
-            thread.start()
-            threads.append(thread)
+        # One shared MQTT connection for all devices
+        if not self._connect():
+            return
+        
+        # Start scheduler thread: một thread publish cho tất cả device types
+        scheduler = threading.Thread(
+            target=self._run_scheduler,
+            args=(available_devices, publish_interval),
+            daemon=True
+        )
+        scheduler.start()
             
         logger.info("=" * 60)
         logger.info("[START] Canonical simulation started! Press Ctrl+C to stop...")
         
+        # Ctrl+C / SIGTERM chỉ set stop_event; main thread block trên Event.wait thay vì poll mỗi giây
+        def _request_stop(signum, frame):
+            self.stop_event.set()
+        signal.signal(signal.SIGINT, _request_stop)
+        signal.signal(signal.SIGTERM, _request_stop)
+        
         try:
-            if duration > 0:
-                time.sleep(duration)
-                logger.info(f"[TIMER] Duration {duration}s completed")
+            if self.stop_event.wait(duration if duration > 0 else None):
+                logger.info("🛑 Stopping simulation...")
             else:
-                while not self.stop_event.is_set():
-                    time.sleep(1)
-        except KeyboardInterrupt:
-            logger.info("🛑 Stopping simulation...")
+                logger.info(f"[TIMER] Duration {duration}s completed")
         finally:
             self.stop_event.set()
+            scheduler.join(timeout=5)
             self._cleanup()
             
-    def _simulate_device_canonical(self, device_type, publish_interval):
-        """Simulate một device type từ canonical data"""
-        device_records = self.device_data[device_type]
+    def _connect(self):
+        """Connect shared MQTT client dùng chung cho tất cả device threads"""
         # Ensure unique client ID để tránh collision
         timestamp = int(time.time() * 1000) % 10000  # Last 4 digits of timestamp
-        client_id = f"canonical_{device_type.lower()}_{timestamp}_sim"
+        client_id = f"canonical_multiplex_{timestamp}_sim"
         
         # Create MQTT client with callback API v2
-        client = mqtt.Client(
+        self.client = mqtt.Client(
             client_id=client_id,
             callback_api_version=mqtt.CallbackAPIVersion.VERSION2
         )
-        self.clients[device_type] = client
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
         
         try:
-            # Connect to broker
-            client.connect(self.broker, self.port, 60)
-            client.loop_start()
-            log_success(device_type)
+            self.client.connect(self.broker, self.port, 60)
+            self.client.loop_start()
+        except Exception as e:
+            logger.error(f"[ERROR] Shared MQTT client connection failed: {e}")
+            return False
             
-            record_idx = 0
-            while not self.stop_event.is_set():
-                # Get next canonical record (cycle through available records)
-                record = device_records.iloc[record_idx % len(device_records)]
-                
-                # Extract canonical fields but fix invalid topics
-                original_topic = record.get('topic', f"canonical/{device_type.lower()}/telemetry")
-                payload = record.get('Payload_sample', '{}')
-                qos = int(record.get('qos', 0))
-                retain = bool(record.get('retain', False))
-                
-                # Fix topic format - canonical dataset has invalid topics like "CO-GAS", "Door Lock"
-                # Convert to proper MQTT topic format
-                if pd.isna(original_topic) or not isinstance(original_topic, str) or '/' not in original_topic:
-                    # Generate proper MQTT topic from device type
-                    device_id = f"device_{(record_idx % 5) + 1:03d}"
-                    topic = f"site/canonical/{device_type.lower()}/{device_id}/telemetry"
+        # Chờ CONNACK để batch đầu tiên không bị bỏ qua
+        if not self.connected.wait(10):
+            logger.error("[ERROR] Shared MQTT client connection failed: no CONNACK from broker")
+            self.client.loop_stop()
+            return False
+            
+        logger.info(f"[OK] Shared MQTT client {client_id} connected")
+        return True
+        
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        if reason_code == 0:
+            self.connected.set()
+        else:
+            logger.error(f"[ERROR] Broker refused connection: {reason_code}")
+            
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None):
+        # Connection state theo dõi qua callbacks: publish path không cần check result.rc từng message
+        self.connected.clear()
+        if not self.stop_event.is_set():
+            logger.warning(f"[WARNING] Shared MQTT client disconnected ({reason_code}), pausing publishes until reconnect")
+        
+    @staticmethod
+    def _column(records, name, default):
+        """Cột `name` của records; dataset thiếu cột thì dùng default cho mọi record"""
+        if name in records.columns:
+            return records[name]
+        return pd.Series(default, index=records.index, dtype=object)
+
+    def _build_device_events(self, device_type):
+        """
+        Chuyển canonical records của một device type thành list CanonicalEvent.
+        Column transforms chạy vectorized một lần và payload serialize một lần; replay loop chỉ còn index vào list.
+        """
+        device_records = self.device_data[device_type]
+        count = len(device_records)
+        
+        # Fix topic format - canonical dataset có topics invalid như "CO-GAS", "Door Lock"
+        # → thay bằng MQTT topic sinh từ device type
+        synthetic_topics = np.array([
+            f"site/canonical/{device_type.lower()}/device_{device_num:03d}/telemetry"
+            for device_num in range(1, 6)
+        ], dtype=object)
+        topics = self._column(device_records, 'topic', None).astype(object)
+        valid_topics = topics.str.contains('/', regex=False, na=False).to_numpy(dtype=bool)
+        topics = np.where(valid_topics, topics.to_numpy(), synthetic_topics[np.arange(count) % len(synthetic_topics)])
+        
+        qos_levels = pd.to_numeric(self._column(device_records, 'qos', 0), errors='coerce').fillna(0).astype(int)
+        retain_flags = pd.to_numeric(self._column(device_records, 'retain', 0), errors='coerce').fillna(0).astype(bool)
+        
+        # Enhance payload với canonical metadata (per-publish fields được thêm trong replay loop)
+        device_meta = {
+            "canonical_source": "dataset_canonical",
+            "device_type": device_type,
+            "flow_stage": "canonical_to_mqtt"
+        }
+        fallback_meta = {
+            "device_type": device_type,
+            "canonical_source": "dataset_canonical"
+        }
+        # Payload_sample trùng nhau (binary sensors như Door, Smoke) → serialize một lần và dùng chung một bytes object
+        prefix_cache = {}
+        payload_prefixes = []
+        for payload in self._column(device_records, 'Payload_sample', '{}').tolist():
+            payload_prefix = prefix_cache.get(payload)
+            if payload_prefix is None:
+                payload_data = self._parse_payload_sample(payload)
+                if payload_data is None:
+                    # Fallback cho malformed payload
+                    base_payload = {**fallback_meta, "raw_payload": str(payload)[:100]}
                 else:
-                    topic = original_topic
+                    base_payload = {**payload_data, **device_meta}
+                payload_prefix = prefix_cache[payload] = _dumps(base_payload)[:-1]
+            payload_prefixes.append(payload_prefix)
                 
-                # Enhance payload với canonical metadata
-                try:
-                    if payload and payload != '{}':
-                        payload_data = json.loads(payload) if isinstance(payload, str) else {}
-                    else:
-                        payload_data = {}
-                        
-                    # Add canonical tracking fields
-                    enhanced_payload = {
-                        **payload_data,
-                        "canonical_source": "dataset_canonical",
-                        "device_type": device_type,
-                        "simulator_timestamp": datetime.now(timezone.utc).isoformat(),
-                        "canonical_record_id": record_idx,
-                        "flow_stage": "canonical_to_mqtt"
-                    }
-                    
-                    final_payload = json.dumps(enhanced_payload)
-                    
-                except (json.JSONDecodeError, Exception):
-                    # Fallback cho malformed payload
-                    final_payload = json.dumps({
-                        "device_type": device_type,
-                        "canonical_source": "dataset_canonical",
-                        "raw_payload": str(payload)[:100],
-                        "simulator_timestamp": datetime.now(timezone.utc).isoformat()
-                    })
+        return [
+            CanonicalEvent(topic, payload_prefix, qos, retain)
+            for topic, payload_prefix, qos, retain
+            in zip(topics.tolist(), payload_prefixes, qos_levels.tolist(), retain_flags.tolist())
+        ]
+        
+    @staticmethod
+    def _parse_payload_sample(payload):
+        """Payload_sample → dict; None nếu không phải JSON object hợp lệ"""
+        if not isinstance(payload, str) or payload in ('', '{}'):
+            return {}
+        try:
+            payload_data = json.loads(payload)
+        except json.JSONDecodeError:
+            return None
+        return payload_data if isinstance(payload_data, dict) else None
+        
+    def _run_scheduler(self, device_types, publish_interval):
+        """
+        Simulate tất cả device types trên một scheduler thread (thay vì một thread mỗi device).
+        Heap (due_time, device_idx) theo time.monotonic(); thread chỉ ngủ tới lần publish kế tiếp,
+        rồi drain một lượt tất cả publishes due trong BATCH_HORIZON.
+        """
+        # Mỗi device replay records qua itertools.cycle iterator thay vì index modulo
+        devices = []
+        for device_type in device_types:
+            try:
+                devices.append((device_type, itertools.cycle(self._build_device_events(device_type))))
+                log_success(device_type)
+            except Exception as e:
+                log_error(device_type, e)
                 
-                # Publish canonical record to MQTT broker
-                result = client.publish(topic, final_payload, qos=qos, retain=retain)
+        published = [0] * len(devices)
+        
+        # Bind các lookups dùng trong vòng lặp publish thành locals (LOAD_FAST thay vì attribute/global lookup mỗi lần)
+        monotonic = time.monotonic
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        wait = self.stop_event.wait
+        stopped = self.stop_event.is_set
+        connected = self.connected.is_set
+        wait_connected = self.connected.wait
+        publish_canonical = self._publish_canonical
+        batch_horizon = self.BATCH_HORIZON
+        
+        start = monotonic()
+        schedule = [(start, device_idx) for device_idx in range(len(devices))]
+        heapq.heapify(schedule)
+        
+        while schedule:
+            delay = schedule[0][0] - monotonic()
+            if delay > 0 and wait(delay):
+                break
+            if stopped():
+                break
                 
-                if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                    logger.info(f"[{device_type}] -> {topic}: {final_payload[:100]}...")
-                else:
-                    logger.warning(f"[{device_type}] Publish failed: {result.rc}")
+            # Pop cả batch trước khi reschedule để interval nhỏ không làm drain loop quay mãi
+            horizon = monotonic() + batch_horizon
+            batch = []
+            while schedule and schedule[0][0] <= horizon:
+                batch.append(heappop(schedule))
                 
-                record_idx += 1
-                time.sleep(publish_interval)
+            # Check connection một lần mỗi batch; khi mất kết nối block tới lúc paho loop reconnect
+            # (không spin), rồi dời cả batch sang thời điểm reconnect
+            if not connected():
+                while not wait_connected(self.RECONNECT_POLL) and not stopped():
+                    pass
+                if stopped():
+                    break
+                resume = monotonic()
+                for _, device_idx in batch:
+                    heappush(schedule, (resume, device_idx))
+                continue
                 
-        except Exception as e:
-            log_error(device_type, e)
-        finally:
-            if client.is_connected():
-                client.loop_stop()
-                client.disconnect()
+            # Một simulator_timestamp chung cho cả batch
+            simulator_timestamp = datetime.now(timezone.utc).isoformat().encode('ascii')
+            for due, device_idx in batch:
+                device_type, events = devices[device_idx]
+                record_idx = published[device_idx]
+                try:
+                    publish_canonical(device_type, next(events), record_idx, simulator_timestamp)
+                except Exception as e:
+                    # Lỗi chỉ dừng device đó, các devices khác tiếp tục
+                    log_error(device_type, e)
+                    continue
+                    
+                published[device_idx] = record_idx + 1
+                heappush(schedule, (due + publish_interval, device_idx))
+            
+        for (device_type, _), count in zip(devices, published):
+            logger.info(f"[{device_type}] Published {count} canonical records")
+            
+    def _publish_canonical(self, device_type, event, record_idx, simulator_timestamp):
+        """Publish một canonical event lên shared client (simulator_timestamp là ISO bytes)"""
+        # Add canonical tracking fields vào payload đã serialize sẵn
+        final_payload = b'%s,"simulator_timestamp":"%s","canonical_record_id":%d}' % (
+            event.payload_prefix,
+            simulator_timestamp,
+            record_idx
+        )
+        
+        # Publish canonical record to MQTT broker (disconnects được báo qua _on_disconnect, không check rc ở đây)
+        self.client.publish(event.topic, final_payload, qos=event.qos, retain=event.retain)
+        
+        if self.verbose:
+            # Decode payload chỉ khi cần log từng message
+            logger.info(f"[{device_type}] -> {event.topic}: {final_payload[:100].decode('utf-8', 'ignore')}...")
                 
     def _cleanup(self):
         """Clean up connections"""
         logger.info("[CLEANUP] Cleaning up MQTT connections...")
-        for device_type, client in self.clients.items():
-            try:
-                if client.is_connected():
-                    client.loop_stop()
-                    client.disconnect()
-                    logger.info(f"  [OK] {device_type} disconnected")
-            except Exception as e:
-                logger.warning(f"  [WARNING] {device_type} cleanup error: {e}")
+        if self.client is None:
+            return
+        try:
+            self.client.loop_stop()
+            self.client.disconnect()
+            logger.info("  [OK] Shared client disconnected")
+        except Exception as e:
+            logger.warning(f"  [WARNING] Shared client cleanup error: {e}")
 
 def main():
     parser = argparse.ArgumentParser(description="Canonical MQTT IoT Simulator - Flow chuẩn")
@@ -397,12 +579,14 @@ def main():
     parser.add_argument("--broker", default="localhost", help="MQTT broker address")
     parser.add_argument("--port", type=int, default=1883, help="MQTT broker port")
     parser.add_argument("--devices", nargs="+", 
-                       choices=["Temperature", "Humidity", "CO2", "Light", "Motion", "Smoke", "Fan", "Door", "Vibration"],
+                       choices=DEVICE_TYPES,
                        help="Specific device types to simulate")
     parser.add_argument("--publish-interval", type=float, default=2.0,
                        help="Interval between publishes (seconds)")
     parser.add_argument("--duration", type=int, default=0,
                        help="Simulation duration in seconds (0 = infinite)")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Log every published message")
     
     args = parser.parse_args()
     
@@ -410,7 +594,8 @@ def main():
         simulator = CanonicalMQTTSimulator(
             canonical_file=args.canonical_file,
             broker=args.broker,
-            port=args.port
+            port=args.port,
+            verbose=args.verbose
         )
         
         simulator.start_simulation(
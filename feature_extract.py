@@ -17,48 +17,35 @@ def safe_json_load(s):
     except Exception:
         return None
 
-def extract_val(x):
-    try:
-        if pd.isna(x):
-            return None
-        if isinstance(x, str):
-            j = safe_json_load(x)
-            if isinstance(j, dict):
-                for k in ("value", "val", "temp", "temperature"):
-                    if k in j:
-                        return j[k]
-                for v in j.values():
-                    if isinstance(v, (int, float)):
-                        return v
-                return None
-            try:
-                return float(x)
-            except Exception:
-                return None
-        elif isinstance(x, dict):
-            for k in ("value", "val"):
-                if k in x:
-                    return x[k]
-            for v in x.values():
-                if isinstance(v, (int, float)):
-                    return v
-            return None
-        elif isinstance(x, (int, float, np.integer, np.floating)):
-            return x
-        else:
-            return None
-    except Exception:
+def json_dict_val(j):
+    if not isinstance(j, dict):
         return None
+    for k in ("value", "val", "temp", "temperature"):
+        if k in j:
+            return j[k]
+    for v in j.values():
+        if isinstance(v, (int, float)):
+            return v
+    return None
 
-def bool_to_int_flag(v):
-    if pd.isna(v):
-        return 0
-    if isinstance(v, (int, float, np.integer, np.floating)):
-        return 1 if int(v) != 0 else 0
-    s = str(v).strip().lower()
-    if s in ("true", "t", "yes", "y", "1"):
-        return 1
-    return 0
+def extract_values(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series.where(series.notna(), None)
+    is_json = series.astype(str).str.lstrip().str.startswith("{")
+    values = pd.to_numeric(series.where(~is_json), errors="coerce").astype(float).astype(object)
+    values = values.where(values.notna(), None)
+    if is_json.any():
+        json_rows = series[is_json]
+        values[is_json] = pd.Series([json_dict_val(safe_json_load(x)) for x in json_rows.tolist()], index=json_rows.index)
+    return values
+
+TRUTHY_FLAGS = ("true", "t", "yes", "y", "1")
+
+def int_flag_series(series):
+    if pd.api.types.is_numeric_dtype(series):
+        numeric = series.astype(float).fillna(0)
+        return (np.trunc(numeric) != 0).astype('int8')
+    return series.astype(str).str.strip().str.lower().isin(TRUTHY_FLAGS).astype('int8')
 
 def resolve_column(df, *candidates):
     lower_map = {col.lower(): col for col in df.columns}
@@ -116,9 +103,9 @@ def main():
     payload_sample_col = resolve_column(df, "payload_sample", "Payload_sample")
     value_col = resolve_column(df, "value")
     if payload_col:
-        df['value_extracted'] = df[payload_col].apply(extract_val)
+        df['value_extracted'] = extract_values(df[payload_col])
     elif payload_sample_col:
-        df['value_extracted'] = df[payload_sample_col].apply(extract_val)
+        df['value_extracted'] = extract_values(df[payload_sample_col])
     elif value_col:
         df['value_extracted'] = df[value_col]
     else:
@@ -126,43 +113,43 @@ def main():
 
     payload_length_col = resolve_column(df, "payload_length")
     if payload_col:
-        df['payload_length'] = df[payload_col].astype(str).str.len().fillna(0).astype(int)
+        df['payload_length'] = df[payload_col].astype(str).str.len().fillna(0).astype('int32')
     elif payload_sample_col:
-        df['payload_length'] = df[payload_sample_col].astype(str).str.len().fillna(0).astype(int)
+        df['payload_length'] = df[payload_sample_col].astype(str).str.len().fillna(0).astype('int32')
     elif value_col:
-        df['payload_length'] = df[value_col].astype(str).str.len().fillna(0).astype(int)
+        df['payload_length'] = df[value_col].astype(str).str.len().fillna(0).astype('int32')
     elif payload_length_col:
-        df['payload_length'] = pd.to_numeric(df[payload_length_col], errors='coerce').fillna(0).astype(int)
+        df['payload_length'] = pd.to_numeric(df[payload_length_col], errors='coerce').fillna(0).astype('int32')
     else:
         df['payload_length'] = 0
 
     if 'qos' in df.columns:
         try:
-            df['qos'] = df['qos'].fillna(0).astype(int)
+            df['qos'] = df['qos'].fillna(0).astype('int8')
         except Exception:
-            df['qos'] = pd.to_numeric(df['qos'], errors='coerce').fillna(0).astype(int)
+            df['qos'] = pd.to_numeric(df['qos'], errors='coerce').fillna(0).astype('int8')
     else:
         qos_col = resolve_column(df, 'qos')
         if qos_col:
-            df['qos'] = pd.to_numeric(df[qos_col], errors='coerce').fillna(0).astype(int)
+            df['qos'] = pd.to_numeric(df[qos_col], errors='coerce').fillna(0).astype('int8')
         else:
             df['qos'] = 0
 
     retain_col = resolve_column(df, 'retain', 'retain_flag')
     if retain_col:
-        df['retain_flag'] = df[retain_col].apply(bool_to_int_flag).astype(int)
+        df['retain_flag'] = int_flag_series(df[retain_col])
     else:
         df['retain_flag'] = 0
 
     dup_col = resolve_column(df, 'dupflag', 'dup_flag')
     if dup_col:
-        df['dup_flag'] = df[dup_col].apply(bool_to_int_flag).astype(int)
+        df['dup_flag'] = int_flag_series(df[dup_col])
     else:
         df['dup_flag'] = 0
 
     msgid_col = resolve_column(df, 'msgid')
     if msgid_col:
-        df['msgid_present'] = (~pd.isna(df[msgid_col])).astype(int)
+        df['msgid_present'] = df[msgid_col].notna().astype('int8')
     else:
         df['msgid_present'] = 0
 
@@ -171,10 +158,9 @@ def main():
     df['timestamp'] = df['timestamp'].astype(int)
 
     group_key = 'client_id' if 'client_id' in df.columns else (src_ip_col if src_ip_col else None)
-    df = df.sort_values('ts')
+    df = df.sort_values('ts', kind='stable', ignore_index=True)
     if group_key:
-        df['prev_ts'] = df.groupby(group_key)['ts'].shift(1)
-        df['iat_sec'] = (df['ts'] - df['prev_ts']).dt.total_seconds().fillna(0.0)
+        df['iat_sec'] = df.groupby(group_key, sort=False)['ts'].diff().dt.total_seconds().fillna(0.0)
     else:
         df['iat_sec'] = 0.0
 
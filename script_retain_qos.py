@@ -3,13 +3,16 @@ import csv
 import json
 import os
 import random
-import string
 import threading
 import time
 from datetime import datetime, timezone
 
+import numpy as np
 import paho.mqtt.client as mqtt
 
+# Bảng ký tự alphanumeric dạng uint8: sinh payload ngẫu nhiên bằng NumPy thay vì loop random từng byte
+_ALPHANUM = np.frombuffer(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", dtype=np.uint8)
+
 class RetainQoSAbuse:
     def __init__(self, args):
         self.args = args
@@ -18,6 +21,7 @@ class RetainQoSAbuse:
         self.log_lock = threading.Lock()
         self.sent_count = 0
         self.retained_topics = set()
+        self._local = threading.local()
         
     @staticmethod
     def _prep_log(path):
@@ -49,8 +53,11 @@ class RetainQoSAbuse:
 
     def generate_payload(self, size_kb=1):
         size_bytes = size_kb * 1024
-        return ''.join(random.choice(string.ascii_letters + string.digits) 
-                      for _ in range(size_bytes))
+        # Each worker thread lazily gets its own Generator for its payloads
+        rng = getattr(self._local, "rng", None)
+        if rng is None:
+            rng = self._local.rng = np.random.default_rng()
+        return _ALPHANUM[rng.integers(0, len(_ALPHANUM), size_bytes)].tobytes().decode('ascii')
 
     def retain_flood_attack(self, client, client_id):
         base_topics = [
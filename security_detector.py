@@ -6,13 +6,17 @@ Feature Extraction → Detection Rules → Alert/Block
 
 import pandas as pd
 import numpy as np
+import atexit
 import json
 import logging
 import argparse
+import re
+import sys
 import time
 from datetime import datetime, timedelta
 import os
-from collections import defaultdict, deque
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import threading
 
 # Setup logging
@@ -25,21 +29,49 @@ class MQTTSecurityDetector:
     Features → Rules → Anomaly Detection → Alert/Block
     """
     
+    ALERT_FIELDS = ('timestamp', 'rule_name', 'severity', 'client_id', 'topic',
+                    'description', 'action', 'blocked')
+    
+    # Columns the rules read; the rest of the features CSV is skipped at parse time
+    # (feature_extract.py ghi cột retain là 'retain_flag')
+    FEATURE_COLUMNS = ('timestamp', 'client_id', 'topic', 'payload_length', 'qos', 'retain', 'retain_flag')
+    
+    # Giá trị default cho cột thiếu / NaN, áp dụng một lần mỗi chunk
+    FEATURE_DEFAULTS = {'client_id': 'unknown', 'topic': '', 'qos': 0, 'retain': 0}
+    
     def __init__(self, features_file=None, output_alerts="security_alerts.csv"):
         self.features_file = features_file
         self.output_alerts = output_alerts
         self.detection_rules = {}
         self.anomaly_models = {}
         self.alert_history = deque(maxlen=1000)
+        self.severity_counts = Counter()
+        self.action_counts = Counter()
+        # Alerts của chunk hiện tại, lưu dạng column lists (SoA) để ghi CSV một lần
+        self._alert_cols = {field: [] for field in self.ALERT_FIELDS}
+        # client_id → integer code (factorized per chunk); client_stats được key bằng code
+        self._client_ids = []
+        self._client_codes = {}
         self.client_stats = defaultdict(lambda: {
             'message_count': 0,
-            'topics': set(),
             'first_seen': None,
             'last_seen': None,
-            'payload_sizes': [],
-            'qos_levels': [],
+            # Fixed-size aggregates thay vì lưu toàn bộ samples
+            'payload_count': 0,
+            'payload_sum': 0,
+            'payload_sqsum': 0,
+            'payload_max': 0,
+            'qos_counts': [0, 0, 0],
+            'retain_count': 0,
+            # Sliding time windows cho rate-based rules
+            'msg_times': deque(),
+            'topic_times': deque(),
+            'topic_counts': Counter(),
+            'retain_times': deque(),
             'suspicious_score': 0
         })
+        # Epoch seconds của record có timestamp gần nhất (seed forward-fill cho chunk kế tiếp)
+        self._last_record_time = np.nan
         
         self._init_detection_rules()
         self._init_alert_log()
@@ -127,13 +159,46 @@ class MQTTSecurityDetector:
             }
         }
         
+        # Compile pattern rules once: one regex pass per chunk instead of a Python loop per row
+        wildcard_patterns = self.detection_rules['wildcard_abuse']['patterns']
+        # Mỗi pattern một alternative `.*?(p)` theo đúng thứ tự list: alternative đầu tiên match thắng, như vòng lặp cũ
+        self._wildcard_re = re.compile('^(?:' + '|'.join('.*?(' + re.escape(p) + ')' for p in wildcard_patterns) + ')', re.DOTALL)
+        system_patterns = self.detection_rules['system_topic_access']['patterns']
+        self._sys_prefixes = tuple(system_patterns)
+        self._sys_re = re.compile('^(' + '|'.join(re.escape(p) for p in system_patterns) + ')')
+        
+        # Alert metadata (name, severity, action, blocked) và description templates dựng sẵn một lần
+        self._rule_meta = {
+            key: (sys.intern(rule['name']), rule['severity'], rule['action'], rule['action'] == 'BLOCK')
+            for key, rule in self.detection_rules.items()
+        }
+        flood = self.detection_rules['flood_detection']
+        topic_enum = self.detection_rules['topic_enumeration']
+        retain = self.detection_rules['retain_abuse']
+        self._flood_desc = f"Client exceeded {flood['threshold']} messages in {flood['window']}s"
+        self._topic_enum_desc_fmt = f"Client accessed %d unique topics in {topic_enum['window']}s"
+        self._retain_desc_fmt = f"Excessive retain messages: %d in {retain['window']}s"
+        self._qos_desc_fmt = "Excessive QoS 2 usage: %d messages"
+        self._payload_desc_fmt = "Anomalous payload size: %s bytes"
+        
+        # Thresholds/windows cho per-row path (_check_row)
+        self._flood_threshold, self._flood_window = flood['threshold'], flood['window']
+        self._topic_enum_threshold, self._topic_enum_window = topic_enum['threshold'], topic_enum['window']
+        self._retain_threshold, self._retain_window = retain['threshold'], retain['window']
+        self._qos2_threshold = self.detection_rules['qos_abuse']['qos2_threshold']
+        
         logger.info(f"✅ Loaded {len(self.detection_rules)} detection rules")
         
     def _init_alert_log(self):
-        """Initialize alert logging"""
-        if not os.path.exists(self.output_alerts):
-            with open(self.output_alerts, 'w') as f:
-                f.write("timestamp,rule_name,severity,client_id,topic,description,action,blocked\n")
+        """Initialize alert logging (một file handle buffered cho cả run)"""
+        write_header = not os.path.exists(self.output_alerts) or os.path.getsize(self.output_alerts) == 0
+        
+        self._alert_fh = open(self.output_alerts, 'a', buffering=1 << 20, newline='', encoding='utf-8')
+        atexit.register(self._alert_fh.close)
+        
+        if write_header:
+            self._alert_fh.write(','.join(self.ALERT_FIELDS) + '\n')
+            self._alert_fh.flush()
                 
         logger.info(f"📝 Alert logging: {self.output_alerts}")
         
@@ -151,245 +216,291 @@ class MQTTSecurityDetector:
         logger.info(f"🔍 Analyzing features from: {self.features_file}")
         
         # Load features in chunks
-        chunk_size = 10000
+        chunk_size = 50000
         total_alerts = 0
         
-        for chunk_num, chunk in enumerate(pd.read_csv(self.features_file, chunksize=chunk_size)):
+        for chunk_num, chunk in enumerate(self._iter_feature_chunks(chunk_size)):
             logger.info(f"📊 Processing chunk {chunk_num + 1}: {len(chunk)} records")
             
-            # Run detection rules on chunk
-            alerts = self._run_detection_rules(chunk)
-            total_alerts += len(alerts)
+            # Run detection rules on chunk (lỗi chỉ bỏ qua phần còn lại của chunk đó)
+            try:
+                alert_count = self._run_detection_rules(self._normalize_chunk(chunk))
+            except Exception as e:
+                logger.warning(f"⚠️ Error processing chunk {chunk_num + 1}: {e}")
+                alert_count = len(self._alert_cols['timestamp'])
+            total_alerts += alert_count
             
             # Log alerts
-            if alerts:
-                self._log_alerts(alerts)
+            if alert_count:
+                self._log_alerts()
                 
         logger.info(f"🚨 Detection completed: {total_alerts} alerts generated")
         self._print_detection_summary()
         
-    def _run_detection_rules(self, data_chunk):
-        """Run tất cả detection rules trên data chunk"""
-        alerts = []
+    def _iter_feature_chunks(self, chunk_size):
+        """
+        Stream features CSV theo chunk, chỉ parse các cột rules cần.
+        Chunk kế tiếp được đọc trên background thread trong lúc rules chạy trên chunk hiện tại.
+        """
+        with pd.read_csv(self.features_file, chunksize=chunk_size,
+                         usecols=lambda column: column in self.FEATURE_COLUMNS) as reader:
+            with ThreadPoolExecutor(max_workers=1) as prefetcher:
+                pending = prefetcher.submit(next, reader, None)
+                while True:
+                    chunk = pending.result()
+                    if chunk is None:
+                        break
+                    pending = prefetcher.submit(next, reader, None)
+                    yield chunk
+                    
+    def _normalize_chunk(self, data_chunk):
+        """
+        Validate schema một lần cho cả chunk: thêm cột thiếu, fill NaN bằng defaults, cố định dtypes.
+        payload_length giữ NaN khi thiếu (không tính là payload anomaly).
+        """
+        if 'retain' not in data_chunk.columns and 'retain_flag' in data_chunk.columns:
+            data_chunk = data_chunk.rename(columns={'retain_flag': 'retain'})
+            
+        for column, default in self.FEATURE_DEFAULTS.items():
+            if column not in data_chunk.columns:
+                data_chunk[column] = default
+        if 'payload_length' not in data_chunk.columns:
+            data_chunk['payload_length'] = np.nan
+            
+        data_chunk = data_chunk.fillna(self.FEATURE_DEFAULTS)
+        data_chunk['client_id'] = data_chunk['client_id'].astype(str)
+        data_chunk['topic'] = data_chunk['topic'].astype(str)
+        data_chunk['payload_length'] = pd.to_numeric(data_chunk['payload_length'], errors='coerce')
+        data_chunk['qos'] = pd.to_numeric(data_chunk['qos'], errors='coerce').fillna(0).astype(np.int8)
+        data_chunk['retain'] = pd.to_numeric(data_chunk['retain'], errors='coerce').fillna(0).astype(np.int8)
+        return data_chunk
         
-        for _, record in data_chunk.iterrows():
-            try:
-                # Update client statistics
-                self._update_client_stats(record)
-                
-                # Run each detection rule
-                alerts.extend(self._check_flood_detection(record))
-                alerts.extend(self._check_topic_enumeration(record))
-                alerts.extend(self._check_wildcard_abuse(record))
-                alerts.extend(self._check_payload_anomaly(record))
-                alerts.extend(self._check_qos_abuse(record))
-                alerts.extend(self._check_system_topic_access(record))
-                alerts.extend(self._check_retain_abuse(record))
+    def _run_detection_rules(self, data_chunk):
+        """Run tất cả detection rules trên data chunk, trả về số alerts mới"""
+        # Vectorized pattern matching: matched pattern per row, NaN where no match
+        wildcard_hits, system_hits = self._match_topic_patterns(data_chunk)
+        payload_hits = self._payload_anomaly_mask(data_chunk)
+        record_times = self._record_times(data_chunk)
+        client_codes = self._factorize_clients(data_chunk)
+        topics = data_chunk['topic'].tolist()
+        payload_lengths = data_chunk['payload_length'].tolist()
+        
+        # Alert timestamp lấy một lần cho cả chunk thay vì datetime.now() mỗi alert
+        self._chunk_alert_ts = datetime.now().isoformat()
+        
+        # Unpack columns một lần thành Python lists; mỗi row chỉ là một tuple các giá trị
+        rows = zip(client_codes.tolist(),
+                   topics,
+                   payload_lengths,
+                   data_chunk['qos'].tolist(),
+                   data_chunk['retain'].tolist(),
+                   record_times.tolist())
+        
+        # Stateful rules (sliding windows, per-client counters) cần đi qua từng row theo thứ tự
+        check_row = self._check_row
+        for row in rows:
+            check_row(*row)
                 
-            except Exception as e:
-                logger.warning(f"⚠️ Error processing record: {e}")
-                continue
+        # Stateless rules chỉ phụ thuộc vào record: emit alerts column-wise từ masks của chunk
+        topics = np.asarray(topics, dtype=object)
+        payload_lengths = np.asarray(payload_lengths, dtype=object)
+        wildcard_mask = wildcard_hits.notna().to_numpy()
+        self._emit_alerts_bulk('wildcard_abuse', client_codes[wildcard_mask], topics[wildcard_mask],
+                               ["Wildcard pattern detected: " + hit for hit in wildcard_hits[wildcard_mask]])
+        self._emit_alerts_bulk('payload_anomaly', client_codes[payload_hits], topics[payload_hits],
+                               [self._payload_desc_fmt % length for length in payload_lengths[payload_hits]])
+        system_mask = system_hits.notna().to_numpy()
+        self._emit_alerts_bulk('system_topic_access', client_codes[system_mask], topics[system_mask],
+                               ["Access to system topic: " + hit for hit in system_hits[system_mask]])
                 
-        return alerts
+        return len(self._alert_cols['timestamp'])
         
-    def _update_client_stats(self, record):
-        """Update client statistics for anomaly detection"""
-        client_id = record.get('client_id', 'unknown')
-        topic = record.get('topic', '')
-        timestamp = pd.to_datetime(record.get('timestamp', datetime.now()))
+    def _factorize_clients(self, data_chunk):
+        """
+        Map client_id column → integer codes (int64 array) ổn định qua các chunk.
+        Chỉ hash string một lần cho mỗi client_id unique trong chunk.
+        """
+        codes, uniques = pd.factorize(data_chunk['client_id'])
+        global_codes = np.array([self._client_code(client_id) for client_id in uniques], dtype=np.int64)
+        return global_codes[codes]
+        
+    def _client_code(self, client_id):
+        """Integer code của client_id, cấp code mới nếu client chưa gặp"""
+        code = self._client_codes.get(client_id)
+        if code is None:
+            code = len(self._client_ids)
+            self._client_codes[client_id] = code
+            self._client_ids.append(client_id)
+        return code
+        
+    def _match_topic_patterns(self, data_chunk):
+        """Match wildcard và system-topic patterns column-wise cho cả chunk"""
+        topics = data_chunk['topic']
+        # Mỗi pattern một capture group; group đầu tiên khác NaN là pattern được report
+        wildcard_hits = topics.str.extract(self._wildcard_re, expand=True).bfill(axis=1).iloc[:, 0]
+        
+        # System topics: str.startswith(tuple) lọc nhanh, chỉ extract prefix trên các rows match
+        system_hits = pd.Series(np.nan, index=topics.index, dtype=object)
+        system_mask = topics.str.startswith(self._sys_prefixes)
+        if system_mask.any():
+            system_hits[system_mask] = topics[system_mask].str.extract(self._sys_re.pattern, expand=False)
+        return wildcard_hits, system_hits
+        
+    def _payload_anomaly_mask(self, data_chunk):
+        """Payload size bounds check cho cả chunk bằng NumPy (NaN lengths never match)"""
+        rules = self.detection_rules['payload_anomaly']
+        payload_length = data_chunk['payload_length'].to_numpy(dtype=np.float64)
+        return (payload_length > rules['max_size']) | (payload_length < rules['min_size'])
         
-        stats = self.client_stats[client_id]
+    def _record_times(self, data_chunk):
+        """
+        Epoch seconds cho cả chunk (float64 array), parse một lần ở chunk level.
+        Features CSV ghi timestamp dạng epoch seconds; chuỗi ISO 8601 được parse bằng pd.to_datetime.
+        Giá trị thiếu hoặc không parse được → forward-fill từ record trước (không dùng wall-clock:
+        data replay có timestamps cũ, một entry "now" sẽ chặn expiry của sliding windows).
+        Chỉ các records chưa có record nào có timestamp đứng trước mới còn NaN.
+        """
+        if 'timestamp' not in data_chunk.columns:
+            seconds = np.full(len(data_chunk), np.nan)
+        else:
+            column = data_chunk['timestamp']
+            if pd.api.types.is_numeric_dtype(column):
+                seconds = column.to_numpy(dtype=np.float64)
+            else:
+                parsed = pd.to_datetime(column, format='ISO8601', utc=True, errors='coerce', cache=True)
+                seconds = ((parsed - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64)
+                
+        seconds = pd.Series(seconds).ffill().fillna(self._last_record_time).to_numpy(dtype=np.float64)
+        if len(seconds) and not np.isnan(seconds[-1]):
+            self._last_record_time = seconds[-1]
+        return seconds
+            
+    @staticmethod
+    def _expire_window(window, cutoff):
+        """Drop timestamps older than cutoff from the left of a time-ordered deque"""
+        while window and window[0] < cutoff:
+            window.popleft()
+            
+    def _emit_alert(self, rule_key, client, topic, description):
+        """Append một alert vào alert columns (SoA) của chunk hiện tại"""
+        rule_name, severity, action, blocked = self._rule_meta[rule_key]
+        cols = self._alert_cols
+        cols['timestamp'].append(self._chunk_alert_ts)
+        cols['rule_name'].append(rule_name)
+        cols['severity'].append(severity)
+        cols['client_id'].append(self._client_ids[client])
+        cols['topic'].append(topic)
+        cols['description'].append(description)
+        cols['action'].append(action)
+        cols['blocked'].append(blocked)
+        
+    def _check_row(self, client, topic, payload_length, qos, retain, timestamp):
+        """
+        Update client statistics và evaluate các stateful detection rules cho một record.
+        Các rules được fuse vào một pass: stats của client lookup một lần, thresholds đọc từ attributes dựng sẵn.
+        """
+        emit = self._emit_alert
+        stats = self.client_stats[client]
         stats['message_count'] += 1
-        stats['topics'].add(topic)
-        stats['last_seen'] = timestamp
         
-        if stats['first_seen'] is None:
-            stats['first_seen'] = timestamp
+        # Record không có timestamp (NaN != NaN): không update first/last_seen và không evaluate các sliding windows
+        has_time = timestamp == timestamp
+        
+        if has_time:
+            stats['last_seen'] = timestamp
+            if stats['first_seen'] is None:
+                stats['first_seen'] = timestamp
             
-        # Track payload sizes và QoS
-        if 'payload_length' in record:
-            stats['payload_sizes'].append(record['payload_length'])
+            # Message rate window (flood detection)
+            msg_times = stats['msg_times']
+            msg_times.append(timestamp)
+            self._expire_window(msg_times, timestamp - self._flood_window)
             
-        if 'qos' in record:
-            stats['qos_levels'].append(record['qos'])
+            # Unique topics window (topic enumeration): deque of (ts, topic) + per-topic counts
+            topic_times = stats['topic_times']
+            topic_counts = stats['topic_counts']
+            topic_times.append((timestamp, topic))
+            topic_counts[topic] += 1
+            cutoff = timestamp - self._topic_enum_window
+            while topic_times and topic_times[0][0] < cutoff:
+                _, old_topic = topic_times.popleft()
+                topic_counts[old_topic] -= 1
+                if not topic_counts[old_topic]:
+                    del topic_counts[old_topic]
             
-    def _check_flood_detection(self, record):
-        """Detect message flooding attacks"""
-        alerts = []
-        client_id = record.get('client_id', 'unknown')
-        stats = self.client_stats[client_id]
-        
-        # Simple rate-based detection (in real implementation, would use sliding window)
-        if stats['message_count'] > self.detection_rules['flood_detection']['threshold']:
-            alert = {
-                'timestamp': datetime.now().isoformat(),
-                'rule_name': 'Message Flood Attack',
-                'severity': 'HIGH',
-                'client_id': client_id,
-                'topic': record.get('topic', ''),
-                'description': f"Client exceeded {self.detection_rules['flood_detection']['threshold']} messages",
-                'action': 'BLOCK',
-                'blocked': True
-            }
-            alerts.append(alert)
+        # Track payload sizes và QoS (running aggregates, O(1) per record); NaN != NaN
+        if payload_length == payload_length:
+            stats['payload_count'] += 1
+            stats['payload_sum'] += payload_length
+            stats['payload_sqsum'] += payload_length * payload_length
+            if payload_length > stats['payload_max']:
+                stats['payload_max'] = payload_length
             
-        return alerts
-        
-    def _check_topic_enumeration(self, record):
-        """Detect topic enumeration attacks"""
-        alerts = []
-        client_id = record.get('client_id', 'unknown')
-        stats = self.client_stats[client_id]
-        
-        # Check for excessive unique topics
-        if len(stats['topics']) > self.detection_rules['topic_enumeration']['threshold']:
-            alert = {
-                'timestamp': datetime.now().isoformat(),
-                'rule_name': 'Topic Enumeration Attack',
-                'severity': 'MEDIUM',
-                'client_id': client_id,
-                'topic': record.get('topic', ''),
-                'description': f"Client accessed {len(stats['topics'])} unique topics",
-                'action': 'ALERT',
-                'blocked': False
-            }
-            alerts.append(alert)
+        if qos in (0, 1, 2):
+            stats['qos_counts'][int(qos)] += 1
             
-        return alerts
-        
-    def _check_wildcard_abuse(self, record):
-        """Detect wildcard subscription abuse"""
-        alerts = []
-        topic = record.get('topic', '')
-        
-        for pattern in self.detection_rules['wildcard_abuse']['patterns']:
-            if pattern in topic:
-                alert = {
-                    'timestamp': datetime.now().isoformat(),
-                    'rule_name': 'Wildcard Subscription Abuse',
-                    'severity': 'MEDIUM',
-                    'client_id': record.get('client_id', 'unknown'),
-                    'topic': topic,
-                    'description': f"Wildcard pattern detected: {pattern}",
-                    'action': 'ALERT',
-                    'blocked': False
-                }
-                alerts.append(alert)
-                break
+        if has_time:
+            # Message flooding: rate over the sliding window
+            if len(msg_times) > self._flood_threshold:
+                emit('flood_detection', client, topic, self._flood_desc)
                 
-        return alerts
-        
-    def _check_payload_anomaly(self, record):
-        """Detect payload size anomalies"""
-        alerts = []
-        payload_length = record.get('payload_length', 0)
-        rules = self.detection_rules['payload_anomaly']
-        
-        if payload_length > rules['max_size'] or payload_length < rules['min_size']:
-            alert = {
-                'timestamp': datetime.now().isoformat(),
-                'rule_name': 'Payload Anomaly Attack',
-                'severity': 'MEDIUM',
-                'client_id': record.get('client_id', 'unknown'),
-                'topic': record.get('topic', ''),
-                'description': f"Anomalous payload size: {payload_length} bytes",
-                'action': 'ALERT',
-                'blocked': False
-            }
-            alerts.append(alert)
+            # Topic enumeration: unique topics within the window
+            unique_topics = len(topic_counts)
+            if unique_topics > self._topic_enum_threshold:
+                emit('topic_enumeration', client, topic, self._topic_enum_desc_fmt % unique_topics)
             
-        return alerts
-        
-    def _check_qos_abuse(self, record):
-        """Detect QoS level abuse"""
-        alerts = []
-        qos = record.get('qos', 0)
-        client_id = record.get('client_id', 'unknown')
-        stats = self.client_stats[client_id]
-        
-        # Count QoS 2 usage
-        qos2_count = sum(1 for q in stats['qos_levels'] if q == 2)
-        
-        if qos2_count > self.detection_rules['qos_abuse']['qos2_threshold']:
-            alert = {
-                'timestamp': datetime.now().isoformat(),
-                'rule_name': 'QoS Level Abuse',
-                'severity': 'LOW',
-                'client_id': client_id,
-                'topic': record.get('topic', ''),
-                'description': f"Excessive QoS 2 usage: {qos2_count} messages",
-                'action': 'MONITOR',
-                'blocked': False
-            }
-            alerts.append(alert)
+        # QoS level abuse: QoS 2 usage count
+        qos2_count = stats['qos_counts'][2]
+        if qos2_count > self._qos2_threshold:
+            emit('qos_abuse', client, topic, self._qos_desc_fmt % qos2_count)
             
-        return alerts
-        
-    def _check_system_topic_access(self, record):
-        """Detect unauthorized system topic access"""
-        alerts = []
-        topic = record.get('topic', '')
-        
-        for pattern in self.detection_rules['system_topic_access']['patterns']:
-            if topic.startswith(pattern):
-                alert = {
-                    'timestamp': datetime.now().isoformat(),
-                    'rule_name': 'Unauthorized System Topic Access',
-                    'severity': 'HIGH',
-                    'client_id': record.get('client_id', 'unknown'),
-                    'topic': topic,
-                    'description': f"Access to system topic: {pattern}",
-                    'action': 'BLOCK',
-                    'blocked': True
-                }
-                alerts.append(alert)
-                break
-                
-        return alerts
-        
-    def _check_retain_abuse(self, record):
-        """Detect retain message abuse"""
-        alerts = []
-        retain = record.get('retain', 0)
-        client_id = record.get('client_id', 'unknown')
-        
+        # Retain message abuse: retain rate over the sliding window
         if retain:
-            # Simple counting (in real implementation would use time windows)
-            stats = self.client_stats[client_id]
-            if not hasattr(stats, 'retain_count'):
-                stats['retain_count'] = 0
             stats['retain_count'] += 1
+        if retain and has_time:
+            retain_times = stats['retain_times']
+            retain_times.append(timestamp)
+            self._expire_window(retain_times, timestamp - self._retain_window)
             
-            if stats['retain_count'] > self.detection_rules['retain_abuse']['threshold']:
-                alert = {
-                    'timestamp': datetime.now().isoformat(),
-                    'rule_name': 'Retain Message Abuse',
-                    'severity': 'MEDIUM',
-                    'client_id': client_id,
-                    'topic': record.get('topic', ''),
-                    'description': f"Excessive retain messages: {stats['retain_count']}",
-                    'action': 'ALERT',
-                    'blocked': False
-                }
-                alerts.append(alert)
+            if len(retain_times) > self._retain_threshold:
+                emit('retain_abuse', client, topic, self._retain_desc_fmt % len(retain_times))
                 
-        return alerts
-        
-    def _log_alerts(self, alerts):
-        """Log alerts to CSV file"""
-        with open(self.output_alerts, 'a') as f:
-            for alert in alerts:
-                f.write(f"{alert['timestamp']},{alert['rule_name']},{alert['severity']},"
-                       f"{alert['client_id']},{alert['topic']},\"{alert['description']}\","
-                       f"{alert['action']},{alert['blocked']}\n")
-                
-        # Add to memory history
-        self.alert_history.extend(alerts)
+    def _emit_alerts_bulk(self, rule_key, clients, topics, descriptions):
+        """Append alerts của một stateless rule cho nhiều records cùng lúc (clients là int codes)"""
+        count = len(descriptions)
+        if not count:
+            return
+            
+        rule_name, severity, action, blocked = self._rule_meta[rule_key]
+        client_ids = self._client_ids
+        cols = self._alert_cols
+        cols['timestamp'].extend([self._chunk_alert_ts] * count)
+        cols['rule_name'].extend([rule_name] * count)
+        cols['severity'].extend([severity] * count)
+        cols['client_id'].extend([client_ids[client] for client in clients.tolist()])
+        cols['topic'].extend(topics.tolist())
+        cols['description'].extend(descriptions)
+        cols['action'].extend([action] * count)
+        cols['blocked'].extend([blocked] * count)
+        
+    def _log_alerts(self):
+        """Flush alert columns của chunk ra CSV bằng một lần to_csv (flushed once per chunk)"""
+        alerts = pd.DataFrame(self._alert_cols, columns=self.ALERT_FIELDS)
+        alerts.to_csv(self._alert_fh, header=False, index=False)
+        self._alert_fh.flush()
+        
+        for column in self._alert_cols.values():
+            column.clear()
+            
+        # Running totals và recent history cho summary
+        self.severity_counts.update(alerts['severity'])
+        self.action_counts.update(alerts['action'])
+        self.alert_history.extend(alerts.tail(self.alert_history.maxlen).to_dict('records'))
         
         # Print high-severity alerts
-        for alert in alerts:
-            if alert['severity'] in ['HIGH', 'CRITICAL']:
-                logger.warning(f"🚨 {alert['severity']} ALERT: {alert['rule_name']} - {alert['description']}")
+        high = alerts[alerts['severity'].isin(['HIGH', 'CRITICAL'])]
+        for severity, rule_name, description in high[['severity', 'rule_name', 'description']].itertuples(index=False):
+            logger.warning(f"🚨 {severity} ALERT: {rule_name} - {description}")
                 
     def _print_detection_summary(self):
         """Print detection summary"""
@@ -397,20 +508,12 @@ class MQTTSecurityDetector:
         logger.info("📋 DETECTION SUMMARY")
         logger.info("=" * 60)
         
-        # Count by severity
-        severity_counts = defaultdict(int)
-        action_counts = defaultdict(int)
-        
-        for alert in self.alert_history:
-            severity_counts[alert['severity']] += 1
-            action_counts[alert['action']] += 1
-            
         logger.info("🚨 Alerts by Severity:")
-        for severity, count in severity_counts.items():
+        for severity, count in self.severity_counts.items():
             logger.info(f"   {severity}: {count}")
             
         logger.info("🛡️ Actions Taken:")
-        for action, count in action_counts.items():
+        for action, count in self.action_counts.items():
             logger.info(f"   {action}: {count}")
             
         logger.info(f"📊 Total Clients Analyzed: {len(self.client_stats)}")
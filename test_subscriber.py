@@ -1,16 +1,39 @@
 import paho.mqtt.client as mqtt
 import json
 import argparse
+import queue
+import sys
+import threading
 from datetime import datetime
 
+# Fast JSON decode/pretty-print: orjson nếu có cài, fallback stdlib json (decode nhận bytes hoặc str)
+try:
+    import orjson
+    _loads = orjson.loads
+    
+    def _pretty(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+except ImportError:
+    _loads = json.loads
+    
+    def _pretty(obj):
+        return json.dumps(obj, indent=2)
+
 class MQTTSubscriber:
-    def __init__(self, broker, port, topics):
+    def __init__(self, broker, port, topics, verbose=False, summary_every=1000):
         self.broker = broker
         self.port = port
         self.topics = topics if isinstance(topics, list) else [topics]
+        self.verbose = verbose
+        self.summary_every = max(summary_every, 1)
         self.client = mqtt.Client(client_id="test_subscriber_001", callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
         self.message_count = 0
         
+        # on_message chỉ enqueue; một writer thread format và ghi stdout (block-buffered, flush khi queue rỗng)
+        self.output_queue = queue.Queue(maxsize=1024)
+        self.dropped_count = 0
+        self.writer = threading.Thread(target=self._write_output, daemon=True)
+        
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
         self.client.on_disconnect = self.on_disconnect
@@ -32,20 +55,51 @@ class MQTTSubscriber:
     
     def on_message(self, client, userdata, msg):
         self.message_count += 1
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        topic = msg.topic
+        if not self.verbose and (self.message_count - 1) % self.summary_every:
+            # Non-verbose: chỉ một dòng summary mỗi summary_every messages, không parse payload
+            return
+        try:
+            self.output_queue.put_nowait((datetime.now(), self.message_count, msg.topic, msg.payload))
+        except queue.Full:
+            # Output không theo kịp message rate: bỏ qua việc in, message vẫn được đếm
+            self.dropped_count += 1
+    
+    def _format_message(self, received_at, count, topic, raw_payload):
+        timestamp = received_at.strftime("%H:%M:%S.%f")[:-3]
+        if not self.verbose:
+            return f"[{timestamp}] #{count} {topic} ({len(raw_payload)} bytes)\n"
         
         try:
-            payload = json.loads(msg.payload.decode('utf-8'))
-            payload_str = json.dumps(payload, indent=2) if len(str(payload)) > 100 else str(payload)
+            payload = _loads(raw_payload)
+            payload_str = _pretty(payload) if len(raw_payload) > 100 else str(payload)
         except:
-            payload_str = msg.payload.decode('utf-8', errors='ignore')
+            payload_str = raw_payload.decode('utf-8', errors='ignore')
         
-        print(f"[{timestamp}] #{self.message_count}")
-        print(f"📍 Topic: {topic}")
-        print(f"📦 Payload: {payload_str}")
-        print(f"📏 Size: {len(msg.payload)} bytes")
-        print("-" * 80)
+        return (
+            f"[{timestamp}] #{count}\n"
+            f"📍 Topic: {topic}\n"
+            f"📦 Payload: {payload_str}\n"
+            f"📏 Size: {len(raw_payload)} bytes\n"
+            + "-" * 80 + "\n"
+        )
+    
+    def _write_output(self):
+        write = sys.stdout.write
+        while True:
+            item = self.output_queue.get()
+            if item is None:
+                break
+            write(self._format_message(*item))
+            if self.output_queue.empty():
+                sys.stdout.flush()
+        sys.stdout.flush()
+    
+    def _stop_writer(self):
+        if self.writer.is_alive():
+            self.output_queue.put(None)
+            self.writer.join(timeout=5)
+        if self.dropped_count:
+            print(f"⚠️  Output skipped for {self.dropped_count} messages (queue full)")
     
     def on_disconnect(self, client, userdata, flags, rc, properties=None):
         if rc != 0:
@@ -59,6 +113,7 @@ class MQTTSubscriber:
         print(f"📋 Topics: {', '.join(self.topics)}")
         print("=" * 80)
         
+        self.writer.start()
         try:
             self.client.connect(self.broker, self.port, 60)
             self.client.loop_forever()
@@ -67,6 +122,9 @@ class MQTTSubscriber:
             self.client.disconnect()
         except Exception as e:
             print(f"❌ Connection error: {e}")
+        finally:
+            # Mọi đường thoát (kể cả loop_forever return sau disconnect) đều flush output queue và join writer
+            self._stop_writer()
 
 def main():
     parser = argparse.ArgumentParser(description="MQTT Subscriber for Testing")
@@ -77,6 +135,9 @@ def main():
     parser.add_argument("--all-zones", action="store_true", help="Subscribe to all zone topics")
     parser.add_argument("--zone", type=int, help="Subscribe to specific zone (1-5)")
     parser.add_argument("--device-type", help="Subscribe to specific device type")
+    parser.add_argument("--verbose", action="store_true", help="Print every message with its decoded payload")
+    parser.add_argument("--summary-every", type=int, default=1000,
+                        help="Without --verbose, print one summary line every N messages")
     
     args = parser.parse_args()
     
@@ -101,7 +162,7 @@ def main():
             "site/tenantA/zone5/waterlevel/+/telemetry"
         ]
     
-    subscriber = MQTTSubscriber(args.broker, args.port, topics)
+    subscriber = MQTTSubscriber(args.broker, args.port, topics, verbose=args.verbose, summary_every=args.summary_every)
     subscriber.start()
 
 if __name__ == "__main__":